@@ -1406,12 +1406,11 @@ NAND backups, and SD card contents. Windows, macOS, and Linux are supported.
         if not app or app.startswith("..") or "/.." in app:
             return await ctx.send("Enter a search term to search for applications.")
         encodedapp = urllib.parse.quote(app)
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(f"https://api.homebrew.space/search/{encodedapp}", timeout=2) as resp:
-                    response = await resp.json()
-            except (aiohttp.ServerConnectionError, aiohttp.ClientConnectorError, aiohttp.ClientResponseError, asyncio.TimeoutError):
-                return await ctx.send("I can't connect to tinydb 💢")
+        try:
+            resp = await self.bot.webclient.get(f"https://api.homebrew.space/search/{encodedapp}", timeout=2, retries=1)
+            response = resp.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return await ctx.send("I can't connect to tinydb 💢")
         if response and len(response) > 0:
             release = response[0]['latestRelease']['3ds_release_files'][0]
             embed = discord.Embed(title=response[0]['name'], image=f"https://api.homebrew.space/qr/{response[0]['id']}/", description=f"{response[0]['description']}\n [[Download]({release['download_url']})] [[Source](https://github.com/{response[0]['github_owner']}/{response[0]['github_repository']})]")
@@ -1586,23 +1585,19 @@ in the scene.
 
         if not name:
             ctx.command.reset_cooldown(ctx)
-            if self.bot.invitefilter.invites:
-                return await ctx.send(f"Valid server names are: {', '.join(x.alias for x in self.bot.invitefilter.invites)}")
+            if self.bot.invitefilter.aliases:
+                return await ctx.send(f"Valid server names are: {', '.join(self.bot.invitefilter.aliases)}")
             else:
                 return await ctx.send("There is no approved servers!")
 
-        invite = await self.bot.invitefilter.fetch_invite_by_alias(alias=name)
+        invite = self.bot.invitefilter.get_by_alias(name)
 
         if invite:
             await ctx.send(f"https://discord.gg/{invite.code}")
-            if invite.is_temporary:
-                if invite.uses > 1:
-                    await self.bot.invitefilter.set_uses(code=invite.code, uses=invite.uses - 1)
-                else:
-                    await self.bot.invitefilter.delete(code=invite.code)
+            self.bot.invitefilter.use(invite.code)
         else:
             ctx.command.reset_cooldown(ctx)
-            await ctx.send(f"Invalid invite name. Valid server names are: {', '.join(x.alias for x in self.bot.invitefilter.invites)}")
+            await ctx.send(f"Invalid invite name. Valid server names are: {', '.join(self.bot.invitefilter.aliases)}")
 
     @commands.command()
     async def db(self, ctx, console=None):
@@ -7,10 +7,13 @@ class AutoNoEmbed(commands.Cog):
     """
     def __init__(self, bot):
         self.bot = bot
+        self.bot.joinpipeline.register('no-embed', self.join_roles)
 
-    @commands.Cog.listener()
-    async def on_member_join(self, member):
-        await member.add_roles(self.bot.roles['No-Embed'], reason="Auto NoEmbed")
+    def cog_unload(self):
+        self.bot.joinpipeline.unregister('no-embed')
+
+    def join_roles(self, member, raid: bool):
+        return [self.bot.roles['No-Embed']]
 
 
 def setup(bot):
@@ -2,16 +2,28 @@ import asyncio
 import discord
 import re
 import random
+import sys
+import traceback
 
-from collections import deque
 from discord.ext import commands
 from urllib.parse import urlparse
-from string import printable
 from subprocess import call
-from typing import List
-from utils.checks import check_staff_id
+from time import monotonic
+from typing import List, Optional, Tuple
+from utils.attachments import AttachmentEntry, AttachmentTracker
+from utils.checks import check_staff_id, is_staff
+from utils.fingerprint import FingerprintIndex, FingerprintRecord, sketch
+from utils.normalize import NormalizedMessage, fold
+from utils.ratelimit import MessageRecord, SlidingWindow, WindowSweeper
+from utils.scanner import ScanCache, ScanContext, ScanEngine, ScanOffloader, ScanOverflow, ScanRule, ScanVerdicts
 from utils import crud, utils
 
+misinformation_url_re = re.compile('|'.join(re.escape(site) for site in (
+    'gudie.racklab', 'guide.racklab', 'gudieracklab', 'guideracklab', 'lyricly.github.io', 'lyriclygithub', 'strawpoii',
+    'hackinformer.com', 'console.guide', 'jacksorrell.co.uk', 'jacksorrell.tv', 'nintendobrew.com', 'reinx.guide', 'nxpenwz',
+    'scenefolks.com')))
+piracy_site_indirect_re = re.compile(r'iso site|chaos site')
+
 
 class Events(commands.Cog):
     """
@@ -20,24 +32,40 @@ class Events(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.scanner = ScanEngine()
+        self.scan_cache = ScanCache()
+        self.scan_offloader = ScanOffloader()
+        self.attachment_tracker = AttachmentTracker(bot.webclient)
+        self.register_rules()
+        self.user_antispam = SlidingWindow(window=3, max_records=20)
+        self.ping_antispam = SlidingWindow(window=10, max_records=10)
+        self.channel_antispam = SlidingWindow(window=5, max_records=50)
+        # near-identical messages from any user in any channel
+        self.duplicate_antispam = FingerprintIndex(window=30, threshold=5)
+        self.antispam_sweeper = WindowSweeper(self.user_antispam, self.ping_antispam, self.channel_antispam, self.duplicate_antispam)
+        bot.jobs.every('antispam-sweep', 1.0, self.antispam_sweeper.sweep)
+
+    def cog_unload(self):
+        self.bot.jobs.remove('antispam-sweep')
+        self.scan_offloader.close()
+        self.attachment_tracker.close()
 
-    def search_word(self, words: str, msg_no_sep: str, message: str) -> List[re.Match]:
-        dect_words = []
-        matches = []
+    @staticmethod
+    def search_word(words: List[str], normalized: NormalizedMessage) -> List[Tuple[int, int]]:
+        """Returns the spans in the original content of the words, ignoring separators between their letters."""
+        spans = []
         for word in words:
-            if word in msg_no_sep:
-                dect_words.append(word)
-        if dect_words:
-            for word in dect_words:
-                if match := self.bot.wordfilter.word_exp[word].search(message):
-                    matches.append(match)
-        return matches
-
-    def highlight_matches(self, matches: List[re.Match], message: str) -> str:
-        msg = message
-        for match in matches:
-            a, b = match.span(0)
-            msg = f"{msg[:a]}**{match.group(0)}**{msg[b:]}"
+            if span := normalized.find(fold(word)):
+                spans.append(span)
+        return spans
+
+    @staticmethod
+    def highlight_matches(matches: List[Tuple[int, int]], normalized: NormalizedMessage) -> str:
+        """Highlights the spans of the original content."""
+        msg = normalized.content
+        # from the end so the inserted markers don't shift the spans left to highlight
+        for a, b in sorted(matches, reverse=True):
+            msg = f"{msg[:a]}**{msg[a:b]}**{msg[b:]}"
         return msg
 
     ignored_file_extensions = (
@@ -51,16 +79,13 @@ class Events(commands.Cog):
         '.sed',
     )
 
-    # I hate naming variables sometimes
-    user_antispam = {}
-    channel_antispam = {}
     help_notice_anti_repeat = []
 
     async def scan_message(self, message, is_edit=False):
         random.seed(message.id)
         embed = discord.Embed(color=utils.gen_color(message.id))
         embed.description = message.content
-        if await crud.is_watched(message.author.id):
+        if self.bot.watchlist.is_watched(message.author.id):
             content = f"**Channel**:\n[#{message.channel.name}]({message.jump_url})\n"
             msg = message.author.mention
             if message.attachments:
@@ -75,325 +100,458 @@ class Events(commands.Cog):
             embed.description = content + embed.description
             if is_edit:
                 msg += " (edited)"
-            await self.bot.channels['watch-logs'].send(msg, embed=embed)
-        is_help_channel = message.channel in self.bot.assistance_channels
-        msg = ''.join(char for char in message.content.lower() if char in printable)
-        msg_no_separators = re.sub(r'[ *_\-~]', '', msg)
-
-        contains_skype_link = "join.skype.com" in msg
-        contains_piracy_site_mention = self.search_word(self.bot.wordfilter.filter['piracy site'], msg_no_separators, msg)
-        contains_piracy_tool_mention = self.search_word(self.bot.wordfilter.filter['piracy tool'], msg_no_separators, msg)
-
-        # modified regular expresion made by deme72
-        res = re.findall(r'(?:(?:https?://)?(?:www.)?)(?:(?:youtube\.com/watch\?v=)|(?:youtu\.be/))([aA-zZ_\-\d]{11})', message.content)
-        contains_video = any(res)
-        contains_piracy_video_id = False if not contains_video else any(x for x in res if x in self.bot.wordfilter.filter['piracy video'])
-
-        res = re.findall(r'(?:discordapp\.com/invite|discord\.gg)/([\w]+)', message.content)
-        approved_invites = [x for x in self.bot.invitefilter.invites if x.code in res]
-        contains_non_approved_invite = len(res) != len(approved_invites)
-
-        contains_piracy_tool_alert_mention = self.search_word(self.bot.wordfilter.filter['piracy tool alert'], msg_no_separators, msg)
-        contains_scamming_site = self.search_word(self.bot.wordfilter.filter['scamming site'], msg_no_separators, msg)
-        contains_piracy_site_mention_indirect = any(x in msg for x in ('iso site', 'chaos site',))
-        contains_misinformation_url_mention = any(x in msg_no_separators for x in ('gudie.racklab', 'guide.racklab', 'gudieracklab', 'guideracklab', 'lyricly.github.io', 'lyriclygithub', 'strawpoii', 'hackinformer.com', 'console.guide', 'jacksorrell.co.uk', 'jacksorrell.tv', 'nintendobrew.com', 'reinx.guide', 'NxpeNwz', 'scenefolks.com'))
-        contains_unbanning_stuff = self.search_word(self.bot.wordfilter.filter['unbanning tool'], msg_no_separators, msg)
-        contains_invite_link = contains_non_approved_invite or contains_skype_link or approved_invites
-        # contains_guide_mirror_mention = any(x in msg for x in ('3ds-guide.b4k.co',))
-        contains_drama_alert = self.search_word(self.bot.wordfilter.filter['drama'], msg_no_separators, msg)
+            self.bot.logdispatcher.send(self.bot.channels['watch-logs'], msg, embed=embed)
 
         for f in message.attachments:
             if not f.filename.lower().endswith(self.ignored_file_extensions):
-                embed2 = discord.Embed(description=f"Size: {f.size}\n"
-                                                   f"Message: [{message.channel.name}]({message.jump_url})\n"
-                                                   f"Download: [{f.filename}]({f.url})")
-                await self.bot.channels['upload-logs'].send(f"📎 **Attachment**: {message.author.mention} "
-                                                            f"uploaded to {message.channel.mention}", embed=embed2)
-        if contains_invite_link:
-            await self.bot.channels['message-logs'].send(
-                f"✉️ **Invite posted**: {message.author.mention} posted an invite link in {message.channel.mention}"
-                f" {'(message deleted)' if contains_non_approved_invite else ''}"
-                f"\n------------------\n"
-                f"{self.bot.escape_text(message.content)}")
-            if contains_non_approved_invite:
-                try:
-                    await message.delete()
-                except discord.NotFound:
-                    pass
-                try:
-                    await message.author.send(
-                        f"Please read {self.bot.channels['welcome-and-rules'].mention}. "
-                        "Server invites must be approved by staff. To contact staff send a message to <@333857992170536961>.")
-                except discord.errors.Forbidden:
-                    pass
-            if approved_invites:
-                for invite in approved_invites:
-                    if invite.is_temporary:
-                        if invite.uses > 1:
-                            await self.bot.invitefilter.set_uses(code=invite.code, uses=invite.uses - 1)
-                        else:
-                            await self.bot.invitefilter.delete(code=invite.code)
-
-        if contains_misinformation_url_mention:
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass
-            await utils.send_dm_message(message.author,
-                                        f"Please read {self.bot.channels['welcome-and-rules'].mention}. "
-                                        f"This site may be misinterpreted as legitimate and cause users harm, therefore your message was automatically deleted.",
-                                        embed=embed)
-            await self.bot.channels['message-logs'].send(
-                f"**Bad site**: {message.author.mention} mentioned a blocked site in {message.channel.mention} (message deleted)",
-                embed=embed)
-        if contains_drama_alert:
-            embed.description = contains_drama_alert
-            await self.bot.channels['message-logs'].send(
-                f"**Potential drama/heated debate Warning**: {message.author.mention} posted a blacklisted word in {message.channel.mention}",
-                embed=embed)
-        if contains_piracy_tool_mention:
-            embed.description = self.highlight_matches(contains_piracy_tool_mention, msg)
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass
-            await utils.send_dm_message(message.author,
-                                        f"Please read {self.bot.channels['welcome-and-rules'].mention}. "
-                                        f"You cannot mention tools used for piracy, therefore your message was automatically deleted.",
-                                        embed=embed)
-            await self.bot.channels['message-logs'].send(
-                f"**Bad tool**: {message.author.mention} mentioned a piracy tool in {message.channel.mention} (message deleted)",
-                embed=embed)
-        if contains_piracy_video_id:
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass
-            await utils.send_dm_message(message.author,
-                                        f"Please read {self.bot.channels['welcome-and-rules'].mention}. "
-                                        f"You cannot link videos that mention piracy, therefore your message was automatically deleted.",
-                                        embed=embed)
-            await self.bot.channels['message-logs'].send(
-                f"**Bad video**: {message.author.mention} linked a banned video in {message.channel.mention} (message deleted)",
-                embed=embed)
-        if contains_piracy_tool_alert_mention:
-            embed.description = self.highlight_matches(contains_piracy_tool_alert_mention, msg)
-            await self.bot.channels['message-logs'].send(
-                f"**Bad tool**: {message.author.mention} likely mentioned a piracy tool in {message.channel.mention}",
-                embed=embed)
-        if contains_piracy_site_mention:
-            embed.description = self.highlight_matches(contains_piracy_site_mention, msg)
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass
-            await utils.send_dm_message(message.author,
-                                        f"Please read {self.bot.channels['welcome-and-rules'].mention}. "
-                                        f"You cannot mention sites used for piracy directly, therefore your message was automatically deleted.",
-                                        embed=embed)
-            await self.bot.channels['message-logs'].send(
-                f"**Bad site**: {message.author.mention} mentioned a piracy site directly in {message.channel.mention} (message deleted)",
-                embed=embed)
-        elif contains_piracy_site_mention_indirect:
-            if is_help_channel:
-                try:
-                    await message.delete()
-                except discord.errors.NotFound:
-                    pass
-                await utils.send_dm_message(message.author,
-                                            f"Please read {self.bot.channels['welcome-and-rules'].mention}. "
-                                            f"You cannot mention sites used for piracy in the help-and-questions channels directly or indirectly, "
-                                            f"therefore your message was automatically deleted.",
-                                            embed=embed)
-            await self.bot.channels['message-logs'].send(
-                f"**Bad site**: {message.author.mention} mentioned a piracy site indirectly in {message.channel.mention}{' (message deleted)' if is_help_channel else ''}",
-                embed=embed)
-        if contains_unbanning_stuff:
-            embed.description = self.highlight_matches(contains_unbanning_stuff, msg)
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass
-            await utils.send_dm_message(message.author,
-                                        f"Please read {self.bot.channels['welcome-and-rules'].mention}. "
-                                        f"You cannot mention sites, programs or services used for unbanning, therefore your message was automatically deleted.",
-                                        embed=embed)
-            await self.bot.channels['message-logs'].send(
-                f"**Bad site**: {message.author.mention} mentioned an unbanning site/service/program directly in {message.channel.mention} (message deleted)",
-                embed=embed)
-        if contains_video and message.channel in self.bot.assistance_channels:
-            await self.bot.channels['message-logs'].send(
-                f"▶️ **Video posted**: {message.author.mention} posted a video in {message.channel.mention}\n------------------\n{message.clean_content}")
-        if contains_scamming_site:
-            embed.description = self.highlight_matches(contains_scamming_site, msg)
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass
-            await crud.add_permanent_role(message.author.id, self.bot.roles['Probation'].id)
-            await message.author.add_roles(self.bot.roles['Probation'])
-            await utils.send_dm_message(message.author,
-                                        f"Please read {self.bot.channels['welcome-and-rules'].mention}. "
-                                        f"You have been probated for posting a link to a scamming site.",
-                                        embed=embed)
-            await self.bot.channels['message-logs'].send(
-                f"**Bad site**: {message.author.mention} mentioned a scamming site in {message.channel.mention} (message deleted, user probated)",
-                embed=embed)
-            await self.bot.channels['mods'].send(
-                f"🔇 **Auto-probated**: {message.author.mention} probated for linking scamming site | {message.author}\n"
-                f"🗓 __Creation__: {message.author.created_at}\n"
-                f"🏷__User ID__: {message.author.id}\n"
-                f"See {self.bot.channels['message-logs'].mention} for the deleted message. @here",
-                allowed_mentions=discord.AllowedMentions(everyone=True))
-
-        # check for guide mirrors and post the actual link
-        urls = re.findall(r'(https?://\S+)', msg)
+                self.bot.loop.create_task(self.log_upload(message, f))
+
+        verdicts = self.scan_cache.get(message.content, self.bot.wordfilter.generation)
+        try:
+            if verdicts is None and self.scan_offloader.is_expensive(message.content):
+                verdicts, ctx, fired = await self.scan_offloader.run(self.evaluate, message, embed, is_edit, None)
+            else:
+                verdicts, ctx, fired = self.evaluate(message, embed, is_edit, verdicts)
+        except (ScanOverflow, asyncio.TimeoutError) as e:
+            await self.hold_for_review(message, embed, "too many messages waiting to be scanned" if isinstance(e, ScanOverflow) else "scan timed out")
+            return None
+        except Exception as e:
+            print(f'Ignoring exception while scanning message {message.id}', file=sys.stderr)
+            traceback.print_tb(e.__traceback__)
+            print(f'{e.__class__.__name__}: {e}', file=sys.stderr)
+            await self.hold_for_review(message, embed, "scan failed")
+            return None
+        self.scanner.record(ctx)
+        self.scan_cache.put(message.content, verdicts)
+        await self.scanner.handle(ctx, fired)
+        return ctx
+
+    def evaluate(self, message, embed: discord.Embed, is_edit: bool, verdicts: Optional[ScanVerdicts]):
+        """Normalizes the message if it wasn't cached and runs the scan checks, without taking any action."""
+        if verdicts is None:
+            generation = self.bot.wordfilter.generation
+            normalized = NormalizedMessage(message.content)
+            verdicts = ScanVerdicts(normalized, self.bot.wordfilter.search(normalized.no_separators), generation)
+        ctx = ScanContext(message, verdicts.normalized, embed, is_edit)
+        ctx.filter_hits = verdicts.filter_hits
+        ctx.results = verdicts.results
+        return verdicts, ctx, self.scanner.evaluate(ctx)
+
+    async def hold_for_review(self, message, embed: discord.Embed, reason: str):
+        """Fails closed when a message couldn't be scanned, deleting it until staff review it."""
+        embed.description = message.content[:2048]
+        self.bot.logdispatcher.send(self.bot.channels['message-logs'],
+            f"⏸️ **Held for review**: {message.author.mention} posted a message in {message.channel.mention} that couldn't be scanned ({reason}, message deleted)",
+            embed=embed, urgent=True)
+        await utils.gather_actions(
+            utils.delete_message(message),
+            utils.send_dm_message(message.author, "Your message was deleted and held for review by the staff because it couldn't be scanned automatically."))
+
+    def register_rules(self):
+        rules = (
+            ScanRule('mention spam', self.check_mention_spam, self.handle_mention_spam, action='probate', cost=0, terminal=True),
+            ScanRule('scamming site', self.word_check('scamming site'), self.handle_scamming_site, action='probate', cost=2, terminal=True, cacheable=True),
+            ScanRule('non-approved invite', self.check_non_approved_invite, self.handle_non_approved_invite, action='delete', cost=1, terminal=True),
+            ScanRule('misinformation site', self.check_misinformation_site, self.handle_misinformation_site, action='delete', cost=1, terminal=True, cacheable=True),
+            ScanRule('piracy video', self.check_piracy_video, self.handle_piracy_video, action='delete', cost=1, terminal=True, cacheable=True),
+            ScanRule('piracy tool', self.word_check('piracy tool'), self.handle_piracy_tool, action='delete', cost=2, terminal=True, cacheable=True),
+            ScanRule('piracy site', self.word_check('piracy site'), self.handle_piracy_site, action='delete', cost=2, terminal=True, cacheable=True),
+            ScanRule('piracy site indirect help', self.check_piracy_site_indirect_help, self.handle_piracy_site_indirect, action='delete', cost=1, terminal=True),
+            ScanRule('unbanning tool', self.word_check('unbanning tool'), self.handle_unbanning_tool, action='delete', cost=2, terminal=True, cacheable=True),
+            ScanRule('guide mirror', self.check_guide_mirror, self.handle_guide_mirror, action='delete', cost=3, terminal=True, cacheable=True),
+            ScanRule('invite', self.check_invite, self.handle_invite, action='log', cost=1),
+            ScanRule('piracy site indirect', self.check_piracy_site_indirect, self.handle_piracy_site_indirect, action='log', cost=1),
+            ScanRule('drama', self.word_check('drama'), self.handle_drama, action='log', cost=2, cacheable=True),
+            ScanRule('piracy tool alert', self.word_check('piracy tool alert'), self.handle_piracy_tool_alert, action='log', cost=2, cacheable=True),
+            ScanRule('video', self.check_video, self.handle_video, action='log', cost=1),
+        )
+        for rule in rules:
+            self.scanner.register(rule)
+
+    async def delete_and_notify(self, ctx: ScanContext, dm_text: str, log_text: str, *actions):
+        """Deletes the message, DMs the author and runs any extra actions concurrently."""
+        self.bot.logdispatcher.send(self.bot.channels['message-logs'], log_text, embed=ctx.embed)
+        await utils.gather_actions(
+            utils.delete_message(ctx.message),
+            utils.send_dm_message(ctx.message.author, f"Please read {self.bot.channels['welcome-and-rules'].mention}. {dm_text}", embed=ctx.embed),
+            *actions)
+
+    def word_check(self, kind: str):
+        def check(ctx: ScanContext) -> List[Tuple[int, int]]:
+            return self.search_word(ctx.filter_hits[kind], ctx.normalized)
+        return check
+
+    @staticmethod
+    def check_misinformation_site(ctx: ScanContext):
+        return misinformation_url_re.search(ctx.normalized.text_no_separators)
+
+    def check_piracy_video(self, ctx: ScanContext) -> bool:
+        return any(video_id in self.bot.wordfilter.video_blocklist for video_id in ctx.normalized.video_ids)
+
+    def check_piracy_site_indirect_help(self, ctx: ScanContext):
+        return ctx.message.channel in self.bot.assistance_channels and piracy_site_indirect_re.search(ctx.normalized.text)
+
+    def check_piracy_site_indirect(self, ctx: ScanContext):
+        return ctx.message.channel not in self.bot.assistance_channels and piracy_site_indirect_re.search(ctx.normalized.text)
+
+    def check_video(self, ctx: ScanContext) -> bool:
+        return any(ctx.normalized.video_ids) and ctx.message.channel in self.bot.assistance_channels
+
+    def sort_invites(self, ctx: ScanContext) -> Tuple[list, list, list]:
+        """Splits the invites of the message in approved invites, non-approved codes and codes that weren't resolved yet.
+
+        Codes that aren't approved directly are matched by the guild they point to."""
+        if ctx.invites is None:
+            approved, rejected, unresolved = [], [], []
+            for code in ctx.normalized.invite_codes:
+                if invite := self.bot.invitefilter.get(code):
+                    approved.append(invite)
+                    continue
+                found, guild_id = self.bot.inviteresolver.peek(code)
+                if not found:
+                    unresolved.append(code)
+                elif guild_id and (invite := self.bot.invitefilter.get_by_guild(guild_id)):
+                    approved.append(invite)
+                else:
+                    rejected.append(code)
+            ctx.invites = approved, rejected, unresolved
+        return ctx.invites
+
+    def check_non_approved_invite(self, ctx: ScanContext) -> bool:
+        """Fires for any code not known to be approved, codes that weren't resolved yet included."""
+        _, rejected, unresolved = self.sort_invites(ctx)
+        return bool(rejected or unresolved)
+
+    def check_invite(self, ctx: ScanContext) -> list:
+        approved_invites = self.sort_invites(ctx)[0]
+        if approved_invites or "join.skype.com" in ctx.normalized.text:
+            return approved_invites or [None]
+        return []
+
+    def check_mention_spam(self, ctx: ScanContext) -> bool:
+        return len(ctx.message.mentions) >= 6 and self.bot.roles['Helpers'] not in ctx.message.author.roles
+
+    @staticmethod
+    def check_guide_mirror(ctx: ScanContext) -> List[str]:
         to_replace = []
-        for url in set(urls):
+        for url in set(ctx.normalized.urls):
             ps = urlparse(url)
             if ps.netloc.startswith('3ds-guide.b4k.co'):
                 to_replace.append(ps._replace(netloc='3ds.hacks.guide').geturl())
             elif ps.netloc.startswith('hax.b4k.co') and ps.path.startswith('/3ds/guide'):
                 to_replace.append(ps._replace(netloc='3ds.guide', path=ps.query[2:], query='').geturl())
-        if to_replace:
-            msg_user = f"Please read {self.bot.channels['welcome-and-rules'].mention}. " \
-                       f"Guide mirrors may not be linked to, therefore your message was automatically deleted.\n" \
-                       f"Please link to <https://3ds.guide> or <https://wiiu.guide> directly instead of mirrors of the sites.\n\n" \
-                       f"The official equivalents of the links are:"
-            for url in to_replace:
-                msg_user += '\n• ' + url
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass
-            await utils.send_dm_message(message.author, msg_user, embed=embed)
-            await self.bot.channels['message-logs'].send(
-                f"**Bad site**: {message.author.mention} mentioned a blocked guide mirror in {message.channel.mention} (message deleted)",
-                embed=embed)
-
-        # check for mention spam
-        if len(message.mentions) >= 6 and not self.bot.roles['Helpers'] in message.author.roles:
-            log_msg = f"🚫 **Auto-probate**: {message.author.mention} probated for mass user mentions | {message.author}\n" \
-                      f"🗓 __Creation__: {message.author.created_at}\n🏷 __User ID__: {message.author.id}"
-            embed = discord.Embed(title="Deleted message", color=discord.Color.gold())
-            embed.add_field(name="#" + message.channel.name, value="\u200b" + message.content)
-            await self.bot.channels['mod-logs'].send(log_msg, embed=embed)
-            await self.bot.channels['mods'].send(
-                f"{log_msg}\nSee {self.bot.channels['mod-logs'].mention} for the deleted message. @here",
-                allowed_mentions=discord.AllowedMentions(everyone=True))
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass
-            await utils.send_dm_message(
-                message.author, f"You were automatically placed under probation in {self.bot.guild.name} for mass user mentions.")
-            await crud.add_permanent_role(message.author.id, self.bot.roles['Probation'].id)
-            await message.author.add_roles(self.bot.roles['Probation'])
-
-    async def user_spam_check(self, message):
-        if message.author.id not in self.user_antispam:
-            self.user_antispam[message.author.id] = []
-        self.user_antispam[message.author.id].append(message)
-        # it can trigger it multiple times if I use >. it can't skip to a number so this should work
-        if len(self.user_antispam[message.author.id]) == 6:
-            await message.author.add_roles(self.bot.roles['Muted'])
-            await message.author.remove_roles(self.bot.roles['#elsewhere'], self.bot.roles['#art-discussion'])
-            await crud.add_permanent_role(message.author.id, self.bot.roles['Muted'].id)
-            msg_user = "You were automatically muted for sending too many messages in a short period of time!\n\n" \
-                       "If you believe this was done in error, send a direct message (DM) to <@!333857992170536961> to contact staff."
-            await utils.send_dm_message(message.author, msg_user)
-            log_msg = f"🔇 **Auto-muted**: {message.author.mention} muted for spamming | {message.author}\n🗓 __Creation__: {message.author.created_at}\n🏷 __User ID__: {message.author.id}"
-            embed = discord.Embed(title="Deleted messages", color=discord.Color.gold())
-            # clone list so nothing is removed while going through it
-            msgs_to_delete = self.user_antispam[message.author.id][:]
-            for msg in msgs_to_delete:
-                embed.add_field(name="#" + msg.channel.name,
-                                value="\u200b" + msg.content)  # added zero-width char to prevent an error with an empty string (lazy workaround)
-            await self.bot.channels['mod-logs'].send(log_msg, embed=embed)
-            await self.bot.channels['mods'].send(
-                f"{log_msg}\nSee {self.bot.channels['mod-logs'].mention} for a list of deleted messages.")
-            for msg in msgs_to_delete:
-                try:
-                    await msg.delete()
-                except discord.errors.NotFound:
-                    pass  # don't fail if the message doesn't exist
-        await asyncio.sleep(3)
-        self.user_antispam[message.author.id].remove(message)
-        try:
-            if len(self.user_antispam[message.author.id]) == 0:
-                self.user_antispam.pop(message.author.id)
-        except KeyError:
-            pass  # if the array doesn't exist, don't raise an error
-
-    async def user_ping_check(self, message):
-        key = "p" + str(message.author.id)
-        if key not in self.user_antispam:
-            self.user_antispam[key] = deque()
-        self.user_antispam[key].append((message, len(message.mentions)))
-        _, user_mentions = zip(*self.user_antispam[key])
-        if sum(user_mentions) > 6:
-            await crud.add_permanent_role(message.author, self.bot.roles["Probation"].id)
-            await message.author.add_roles(self.bot.roles['Probation'])
-            msg_user = "You were automatically placed under probation for mentioning too many users in a short period of time!\n\n" \
-                       "If you believe this was done in error, send a direct message (DM) to <@!333857992170536961> to contact staff."
-            await utils.send_dm_message(message.author, msg_user)
-            log_msg = f"🚫 **Auto-probated**: {message.author.mention} probated for mass user mentions | {message.author}\n" \
-                      f"🗓 __Creation__: {message.author.created_at}\n🏷 __User ID__: {message.author.id}"
-            embed = discord.Embed(title="Deleted messages", color=discord.Color.gold())
-            # clone list so nothing is removed while going through it
-            msgs_to_delete = self.user_antispam[key].copy()
-            for msg in msgs_to_delete:
-                # added zero-width char to prevent an error with an empty string (lazy workaround)
-                embed.add_field(name="#" + msg[0].channel.name, value="\u200b" + msg[0].content)
-            await self.bot.channels['mod-logs'].send(log_msg, embed=embed)
-            await self.bot.channels['mods'].send(
-                f"{log_msg}\nSee {self.bot.channels['mod-logs'].mention} for a list of deleted messages. @here",
-                allowed_mentions=discord.AllowedMentions(everyone=True))
-            for msg in msgs_to_delete:
-                try:
-                    await msg[0].delete()
-                except discord.errors.NotFound:
-                    pass  # don't fail if the message doesn't exist
-            self.user_antispam[key].clear()
+        return to_replace
+
+    async def handle_invite(self, ctx: ScanContext, approved_invites: list):
+        message = ctx.message
+        self.bot.logdispatcher.send(self.bot.channels['message-logs'],
+            f"✉️ **Invite posted**: {message.author.mention} posted an invite link in {message.channel.mention} "
+            f"\n------------------\n"
+            f"{self.bot.escape_text(message.content)}")
+        for invite in approved_invites:
+            if invite:
+                self.bot.invitefilter.use(invite.code)
+
+    async def handle_non_approved_invite(self, ctx: ScanContext, result):
+        _, rejected, unresolved = ctx.invites
+        if rejected:
+            return await self.punish_non_approved_invite(ctx)
+        # the message doesn't wait for the API, resolving the codes only decides how it's logged
+        await utils.delete_message(ctx.message)
+        self.bot.loop.create_task(self.recheck_invites(ctx, unresolved))
+
+    async def recheck_invites(self, ctx: ScanContext, codes: List[str]):
+        results = await asyncio.gather(*(self.bot.inviteresolver.resolve(code) for code in codes), return_exceptions=True)
+        unknown = False
+        for guild_id in results:
+            if isinstance(guild_id, Exception):
+                # the API failing says nothing about the invite, it's not held against the author
+                unknown = True
+            elif guild_id is None or not self.bot.invitefilter.get_by_guild(guild_id):
+                return await self.punish_non_approved_invite(ctx)
+        message = ctx.message
+        note = "the invite couldn't be checked" if unknown else "deleted before the invite was matched to an approved server"
+        self.bot.logdispatcher.send(self.bot.channels['message-logs'],
+            f"✉️ **Invite posted**: {message.author.mention} posted an invite link in {message.channel.mention} (message deleted, {note})"
+            f"\n------------------\n"
+            f"{self.bot.escape_text(message.content)}")
+
+    async def punish_non_approved_invite(self, ctx: ScanContext):
+        message = ctx.message
+        self.bot.logdispatcher.send(self.bot.channels['message-logs'],
+            f"✉️ **Invite posted**: {message.author.mention} posted an invite link in {message.channel.mention} (message deleted)"
+            f"\n------------------\n"
+            f"{self.bot.escape_text(message.content)}")
+        await utils.gather_actions(
+            utils.delete_message(message),
+            utils.send_dm_message(message.author, f"Please read {self.bot.channels['welcome-and-rules'].mention}. "
+                                                  "Server invites must be approved by staff. To contact staff send a message to <@333857992170536961>."))
+
+    async def handle_misinformation_site(self, ctx: ScanContext, result):
+        await self.delete_and_notify(
+            ctx, "This site may be misinterpreted as legitimate and cause users harm, therefore your message was automatically deleted.",
+            f"**Bad site**: {ctx.message.author.mention} mentioned a blocked site in {ctx.message.channel.mention} (message deleted)")
+
+    async def handle_drama(self, ctx: ScanContext, matches: List[Tuple[int, int]]):
+        ctx.embed.description = self.highlight_matches(matches, ctx.normalized)
+        self.bot.logdispatcher.send(self.bot.channels['message-logs'],
+            f"**Potential drama/heated debate Warning**: {ctx.message.author.mention} posted a blacklisted word in {ctx.message.channel.mention}",
+            embed=ctx.embed)
+
+    async def handle_piracy_tool(self, ctx: ScanContext, matches: List[Tuple[int, int]]):
+        ctx.embed.description = self.highlight_matches(matches, ctx.normalized)
+        await self.delete_and_notify(
+            ctx, "You cannot mention tools used for piracy, therefore your message was automatically deleted.",
+            f"**Bad tool**: {ctx.message.author.mention} mentioned a piracy tool in {ctx.message.channel.mention} (message deleted)")
+
+    async def handle_piracy_video(self, ctx: ScanContext, result):
+        await self.delete_and_notify(
+            ctx, "You cannot link videos that mention piracy, therefore your message was automatically deleted.",
+            f"**Bad video**: {ctx.message.author.mention} linked a banned video in {ctx.message.channel.mention} (message deleted)")
+
+    async def handle_piracy_tool_alert(self, ctx: ScanContext, matches: List[Tuple[int, int]]):
+        ctx.embed.description = self.highlight_matches(matches, ctx.normalized)
+        self.bot.logdispatcher.send(self.bot.channels['message-logs'],
+            f"**Bad tool**: {ctx.message.author.mention} likely mentioned a piracy tool in {ctx.message.channel.mention}",
+            embed=ctx.embed)
+
+    async def handle_piracy_site(self, ctx: ScanContext, matches: List[Tuple[int, int]]):
+        ctx.embed.description = self.highlight_matches(matches, ctx.normalized)
+        await self.delete_and_notify(
+            ctx, "You cannot mention sites used for piracy directly, therefore your message was automatically deleted.",
+            f"**Bad site**: {ctx.message.author.mention} mentioned a piracy site directly in {ctx.message.channel.mention} (message deleted)")
+
+    async def handle_piracy_site_indirect(self, ctx: ScanContext, result):
+        message = ctx.message
+        is_help_channel = message.channel in self.bot.assistance_channels
+        log_text = f"**Bad site**: {message.author.mention} mentioned a piracy site indirectly in {message.channel.mention}{' (message deleted)' if is_help_channel else ''}"
+        if is_help_channel:
+            await self.delete_and_notify(
+                ctx, "You cannot mention sites used for piracy in the help-and-questions channels directly or indirectly, "
+                     "therefore your message was automatically deleted.",
+                log_text)
         else:
-            await asyncio.sleep(10)
-            self.user_antispam[key].popleft()
-        try:
-            if len(self.user_antispam[key]) == 0:
-                self.user_antispam.pop(key)
-        except KeyError:
-            pass  # if the array doesn't exist, don't raise an error
-
-    async def channel_spam_check(self, message):
-        if message.channel.id not in self.channel_antispam:
-            self.channel_antispam[message.channel.id] = []
-        self.channel_antispam[message.channel.id].append(message)
+            self.bot.logdispatcher.send(self.bot.channels['message-logs'], log_text, embed=ctx.embed)
+
+    async def handle_unbanning_tool(self, ctx: ScanContext, matches: List[Tuple[int, int]]):
+        ctx.embed.description = self.highlight_matches(matches, ctx.normalized)
+        await self.delete_and_notify(
+            ctx, "You cannot mention sites, programs or services used for unbanning, therefore your message was automatically deleted.",
+            f"**Bad site**: {ctx.message.author.mention} mentioned an unbanning site/service/program directly in {ctx.message.channel.mention} (message deleted)")
+
+    async def handle_video(self, ctx: ScanContext, result):
+        message = ctx.message
+        self.bot.logdispatcher.send(self.bot.channels['message-logs'],
+            f"▶️ **Video posted**: {message.author.mention} posted a video in {message.channel.mention}\n------------------\n{message.clean_content}")
+
+    async def handle_scamming_site(self, ctx: ScanContext, matches: List[Tuple[int, int]]):
+        message = ctx.message
+        ctx.embed.description = self.highlight_matches(matches, ctx.normalized)
+        self.bot.logdispatcher.send(self.bot.channels['mods'],
+            f"🔇 **Auto-probated**: {message.author.mention} probated for linking scamming site | {message.author}\n"
+            f"🗓 __Creation__: {message.author.created_at}\n"
+            f"🏷__User ID__: {message.author.id}\n"
+            f"See {self.bot.channels['message-logs'].mention} for the deleted message. @here",
+            allowed_mentions=discord.AllowedMentions(everyone=True), urgent=True)
+        await self.delete_and_notify(
+            ctx, "You have been probated for posting a link to a scamming site.",
+            f"**Bad site**: {message.author.mention} mentioned a scamming site in {message.channel.mention} (message deleted, user probated)",
+            crud.add_permanent_role(message.author.id, self.bot.roles['Probation'].id),
+            message.author.add_roles(self.bot.roles['Probation']))
+
+    async def handle_guide_mirror(self, ctx: ScanContext, to_replace: List[str]):
+        msg_user = "Guide mirrors may not be linked to, therefore your message was automatically deleted.\n" \
+                   "Please link to <https://3ds.guide> or <https://wiiu.guide> directly instead of mirrors of the sites.\n\n" \
+                   "The official equivalents of the links are:"
+        for url in to_replace:
+            msg_user += '\n• ' + url
+        await self.delete_and_notify(
+            ctx, msg_user,
+            f"**Bad site**: {ctx.message.author.mention} mentioned a blocked guide mirror in {ctx.message.channel.mention} (message deleted)")
+
+    async def handle_mention_spam(self, ctx: ScanContext, result):
+        message = ctx.message
+        log_msg = f"🚫 **Auto-probate**: {message.author.mention} probated for mass user mentions | {message.author}\n" \
+                  f"🗓 __Creation__: {message.author.created_at}\n🏷 __User ID__: {message.author.id}"
+        embed = discord.Embed(title="Deleted message", color=discord.Color.gold())
+        embed.add_field(name="#" + message.channel.name, value="\u200b" + message.content)
+        self.bot.logdispatcher.send(self.bot.channels['mod-logs'], log_msg, embed=embed)
+        self.bot.logdispatcher.send(self.bot.channels['mods'],
+            f"{log_msg}\nSee {self.bot.channels['mod-logs'].mention} for the deleted message. @here",
+            allowed_mentions=discord.AllowedMentions(everyone=True), urgent=True)
+        await utils.gather_actions(
+            utils.delete_message(message),
+            utils.send_dm_message(message.author, f"You were automatically placed under probation in {self.bot.guild.name} for mass user mentions."),
+            crud.add_permanent_role(message.author.id, self.bot.roles['Probation'].id),
+            message.author.add_roles(self.bot.roles['Probation']))
+
+    # seconds reposts of a file are collected before they are logged
+    repost_log_delay = 30
+
+    async def log_upload(self, message, attachment: discord.Attachment):
+        entry, seen = await self.attachment_tracker.track(attachment, message)
+        if not seen:
+            embed = discord.Embed(description=f"Size: {attachment.size}\n"
+                                              f"Message: [{message.channel.name}]({message.jump_url})\n"
+                                              f"Download: [{attachment.filename}]({attachment.url})")
+            self.bot.logdispatcher.send(self.bot.channels['upload-logs'], f"📎 **Attachment**: {message.author.mention} "
+                                                                          f"uploaded to {message.channel.mention}", embed=embed)
+        elif entry.flush_task is None or entry.flush_task.done():
+            entry.flush_task = self.bot.loop.create_task(self.log_reposts(entry))
+
+    async def log_reposts(self, entry: AttachmentEntry):
+        await asyncio.sleep(self.repost_log_delay)
+        reposts, entry.reposts = entry.reposts, []
+        if not reposts:
+            return
+        users = ' '.join(dict.fromkeys(f"<@{upload.user_id}>" for upload in reposts))
+        channels = ' '.join(dict.fromkeys(f"<#{upload.channel_id}>" for upload in reposts))
+        embed = discord.Embed(description=f"Size: {entry.size}\n"
+                                          f"Last message: [link]({reposts[-1].jump_url})\n"
+                                          f"Uploaded {entry.count} times in total")
+        self.bot.logdispatcher.send(self.bot.channels['upload-logs'],
+            f"📎 **Attachment repost** ×{len(reposts)}: `{entry.filename}` was uploaded again by {users} to {channels}"[:2000], embed=embed)
+
+    @is_staff("Helper")
+    @commands.command()
+    async def filehistory(self, ctx, *, filename: str):
+        """Shows the recent uploads of a file by name."""
+        entries = self.attachment_tracker.lookup(filename)
+        if not entries:
+            return await ctx.send("This file wasn't uploaded recently!")
+        embed = discord.Embed(title=f"Recent uploads of {filename}", color=discord.Color.gold())
+        now = monotonic()
+        for idx, entry in enumerate(entries[:5]):
+            uploads = '\n'.join(f"<@{upload.user_id}> in <#{upload.channel_id}> [{now - upload.timestamp:.0f}s ago]({upload.jump_url})"
+                                for upload in reversed(entry.uploads))
+            embed.add_field(name=f"{idx + 1}: {entry.size} bytes, uploaded {entry.count} times", value=uploads[:1024], inline=False)
+        await ctx.send(embed=embed)
+
+    @is_staff("Helper")
+    @commands.command()
+    async def scanstats(self, ctx):
+        """Shows the hit count and average check time of every message scan rule."""
+        embed = discord.Embed(title="Message scan rules", color=discord.Color.blue())
+        embed.description = '\n'.join(f"`{rule.name}` ({rule.action}{', terminal' if rule.terminal else ''}, cost {rule.cost}): "
+                                      f"{rule.hits}/{rule.runs + rule.cached} hits ({rule.cached} cached), {rule.average_time:.1f}µs avg"
+                                      for rule in self.scanner.rules)
+        embed.set_footer(text=f"Verdict cache: {self.scan_cache.hits} hits, {self.scan_cache.misses} misses, {len(self.scan_cache.verdicts)} entries")
+        await ctx.send(embed=embed)
+
+    def cached_message(self, record: MessageRecord):
+        return discord.utils.get(self.bot.cached_messages, id=record.message_id)
+
+    def deleted_messages_embed(self, records: List[MessageRecord]) -> discord.Embed:
+        embed = discord.Embed(title="Deleted messages", color=discord.Color.gold())
+        for record in records:
+            channel = self.bot.get_channel(record.channel_id)
+            msg = self.cached_message(record)
+            # added zero-width char to prevent an error with an empty string (lazy workaround)
+            embed.add_field(name="#" + (channel.name if channel else str(record.channel_id)),
+                            value="\u200b" + (msg.content if msg else f"Message {record.message_id} is not cached"))
+        return embed
+
+    def delete_records(self, records: List[MessageRecord]) -> list:
+        """Returns the deletions of the recorded messages to be run with the other actions."""
+        return [utils.delete_message(channel.get_partial_message(record.message_id))
+                for record in records if (channel := self.bot.get_channel(record.channel_id))]
+
+    # messages shorter than this are too common to be fingerprinted
+    min_fingerprint_length = 20
+
+    def check_antispam(self, message, normalized: Optional[NormalizedMessage]):
+        record = MessageRecord(message.id, message.channel.id, monotonic(), len(message.mentions))
         # it can trigger it multiple times if I use >. it can't skip to a number so this should work
-        if len(self.channel_antispam[message.channel.id]) == 22:
-            await message.channel.set_permission(self.bot.guild.default_role, send_messages=False)
-            msg_channel = "This channel has been automatically locked for spam. Please wait while staff review the situation."
-            embed = discord.Embed(title="Deleted messages", color=discord.Color.gold())
-            # msgs_to_delete = self.user_antispam[message.author.id][:]  # clone list so nothing is removed while going through it
-            # for msg in msgs_to_delete:
-            #     embed.add_field(name="@"+self.bot.help_command.remove_mentions(msg.author), value="\u200b" + msg.content)  # added zero-width char to prevent an error with an empty string (lazy workaround)
-            await message.channel.send(msg_channel)
-            log_msg = f"🔒 **Auto-locked**: {message.channel.mention} locked for spam"
-            await self.bot.channels['mod-logs'].send(log_msg, embed=embed)
-            await self.bot.channels['mods'].send(f"{log_msg} @here\nSee {self.bot.channels['mod-logs'].mention} for a list of deleted messages.",
-                                                 allowed_mentions=discord.AllowedMentions(everyone=True))
-            # msgs_to_delete = self.channel_antispam[message.channel.id][:]  # clone list so nothing is removed while going through it
-            # for msg in msgs_to_delete:
-            #     try:
-            #         await self.bot.delete_message(msg)
-            #     except discord.errors.NotFound:
-            #         pass  # don't fail if the message doesn't exist
-        await asyncio.sleep(5)
-        self.channel_antispam[message.channel.id].remove(message)
-        try:
-            if len(self.channel_antispam[message.channel.id]) == 0:
-                self.channel_antispam.pop(message.channel.id)
-        except KeyError:
-            pass  # if the array doesn't exist, don't raise an error
+        if len(user_records := self.user_antispam.add(message.author.id, record)) == 6:
+            self.bot.loop.create_task(self.user_spam_mute(message, list(user_records)))
+        if record.mentions:
+            if sum(r.mentions for r in self.ping_antispam.add(message.author.id, record)) > 6:
+                self.bot.loop.create_task(self.user_ping_probate(message, self.ping_antispam.pop(message.author.id)))
+        if len(self.channel_antispam.add(message.channel.id, record)) == 22:
+            self.bot.loop.create_task(self.channel_spam_lock(message))
+        if normalized and len(normalized.no_separators) >= self.min_fingerprint_length:
+            fingerprint = FingerprintRecord(message.id, message.channel.id, message.author.id, record.timestamp,
+                                            sketch(normalized.no_separators))
+            if records := self.duplicate_antispam.add(fingerprint):
+                self.bot.loop.create_task(self.duplicate_spam_mute(records))
+
+    async def user_spam_mute(self, message, records: List[MessageRecord]):
+        msg_user = "You were automatically muted for sending too many messages in a short period of time!\n\n" \
+                   "If you believe this was done in error, send a direct message (DM) to <@!333857992170536961> to contact staff."
+        log_msg = f"🔇 **Auto-muted**: {message.author.mention} muted for spamming | {message.author}\n🗓 __Creation__: {message.author.created_at}\n🏷 __User ID__: {message.author.id}"
+        self.bot.logdispatcher.send(self.bot.channels['mod-logs'], log_msg, embed=self.deleted_messages_embed(records))
+        self.bot.logdispatcher.send(self.bot.channels['mods'],
+            f"{log_msg}\nSee {self.bot.channels['mod-logs'].mention} for a list of deleted messages.")
+        await utils.gather_actions(
+            message.author.add_roles(self.bot.roles['Muted']),
+            message.author.remove_roles(self.bot.roles['#elsewhere'], self.bot.roles['#art-discussion']),
+            crud.add_permanent_role(message.author.id, self.bot.roles['Muted'].id),
+            utils.send_dm_message(message.author, msg_user),
+            *self.delete_records(records))
+
+    async def user_ping_probate(self, message, records: List[MessageRecord]):
+        msg_user = "You were automatically placed under probation for mentioning too many users in a short period of time!\n\n" \
+                   "If you believe this was done in error, send a direct message (DM) to <@!333857992170536961> to contact staff."
+        log_msg = f"🚫 **Auto-probated**: {message.author.mention} probated for mass user mentions | {message.author}\n" \
+                  f"🗓 __Creation__: {message.author.created_at}\n🏷 __User ID__: {message.author.id}"
+        self.bot.logdispatcher.send(self.bot.channels['mod-logs'], log_msg, embed=self.deleted_messages_embed(records))
+        self.bot.logdispatcher.send(self.bot.channels['mods'],
+            f"{log_msg}\nSee {self.bot.channels['mod-logs'].mention} for a list of deleted messages. @here",
+            allowed_mentions=discord.AllowedMentions(everyone=True), urgent=True)
+        await utils.gather_actions(
+            crud.add_permanent_role(message.author.id, self.bot.roles["Probation"].id),
+            message.author.add_roles(self.bot.roles['Probation']),
+            utils.send_dm_message(message.author, msg_user),
+            *self.delete_records(records))
+
+    async def duplicate_spam_mute(self, records: List[FingerprintRecord]):
+        members = [member for author_id in dict.fromkeys(r.author_id for r in records)
+                   if (member := self.bot.guild.get_member(author_id))]
+        if not members:
+            return
+        msg_user = "You were automatically muted for posting a message that is being spammed across the server!\n\n" \
+                   "If you believe this was done in error, send a direct message (DM) to <@!333857992170536961> to contact staff."
+        flood = records[-1].flood
+        if flood.alerted:
+            # staff was already pinged for this flood, later copies are only logged and merged by the dispatcher
+            for member in members:
+                self.bot.logdispatcher.send(self.bot.channels['mod-logs'],
+                    f"🔇 **Auto-muted**: {member.mention} | {member.id} posted the flooded message again in <#{records[-1].channel_id}> ({flood.size} copies so far)")
+        else:
+            flood.alerted = True
+            self.duplicate_spam_alert(records, members)
+        actions = []
+        for member in members:
+            actions += [member.add_roles(self.bot.roles['Muted']),
+                        member.remove_roles(self.bot.roles['#elsewhere'], self.bot.roles['#art-discussion']),
+                        crud.add_permanent_role(member.id, self.bot.roles['Muted'].id),
+                        utils.send_dm_message(member, msg_user)]
+        await utils.gather_actions(*actions, *self.delete_records(records))
+
+    def duplicate_spam_alert(self, records: List[FingerprintRecord], members: List[discord.Member]):
+        channels = {r.channel_id for r in records}
+        log_msg = f"🔇 **Auto-muted**: {len(members)} user(s) muted for posting the same message {len(records)} times in {len(channels)} channel(s)"
+        embed = discord.Embed(title="Deleted messages", color=discord.Color.gold())
+        msg = next((msg for record in records if (msg := self.cached_message(record))), None)
+        embed.description = msg.content[:1024] if msg else "Messages are not cached"
+        embed.add_field(name="Users", value='\n'.join(f"{m.mention} | {m} | {m.id}" for m in members[:20])
+                        + (f"\nand {len(members) - 20} more" if len(members) > 20 else ""))
+        embed.add_field(name="Channels", value=' '.join(f"<#{channel_id}>" for channel_id in channels))
+        self.bot.logdispatcher.send(self.bot.channels['mod-logs'], log_msg, embed=embed)
+        self.bot.logdispatcher.send(self.bot.channels['mods'],
+            f"{log_msg}\nSee {self.bot.channels['mod-logs'].mention} for the list of users. @here",
+            allowed_mentions=discord.AllowedMentions(everyone=True), urgent=True)
+
+    async def channel_spam_lock(self, message):
+        msg_channel = "This channel has been automatically locked for spam. Please wait while staff review the situation."
+        embed = discord.Embed(title="Deleted messages", color=discord.Color.gold())
+        await utils.gather_actions(
+            message.channel.set_permissions(self.bot.guild.default_role, send_messages=False),
+            message.channel.send(msg_channel))
+        log_msg = f"🔒 **Auto-locked**: {message.channel.mention} locked for spam"
+        self.bot.logdispatcher.send(self.bot.channels['mod-logs'], log_msg, embed=embed)
+        self.bot.logdispatcher.send(self.bot.channels['mods'], f"{log_msg} @here\nSee {self.bot.channels['mod-logs'].mention} for a list of deleted messages.",
+                                    allowed_mentions=discord.AllowedMentions(everyone=True), urgent=True)
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -408,25 +566,20 @@ class Events(commands.Cog):
                     await self.bot.close()
                 return
         await self.bot.wait_until_all_ready()
-        if message.author == message.guild.me or await check_staff_id('Helper', message.author.id) \
-                or await crud.check_nofilter(message.channel):
+        if message.author == message.guild.me or self.bot.channelstate.is_nofilter(message.channel) \
+                or await check_staff_id('Helper', message.author.id):
             return
-        await self.scan_message(message)
-        self.bot.loop.create_task(self.user_ping_check(message))
-        self.bot.loop.create_task(self.user_spam_check(message))
-        self.bot.loop.create_task(self.channel_spam_check(message))
+        ctx = await self.scan_message(message)
+        self.check_antispam(message, ctx.normalized if ctx else None)
 
     @commands.Cog.listener()
     async def on_message_edit(self, message_before, message_after):
-        if isinstance(message_before.channel, discord.abc.PrivateChannel):
+        # embed unfurls and pins also fire edits, skip them before any lookup
+        if isinstance(message_before.channel, discord.abc.PrivateChannel) or message_before.content == message_after.content:
             return
         await self.bot.wait_until_all_ready()
-        if await crud.check_nofilter(message_before.channel):
-            return
-        if message_after.author == self.bot.guild.me or await check_staff_id('Helper', message_after.author.id) \
-                or await crud.check_nofilter(message_after.channel):
-            return
-        if message_before.content == message_after.content:
+        if message_after.author == self.bot.guild.me or self.bot.channelstate.is_nofilter(message_after.channel) \
+                or await check_staff_id('Helper', message_after.author.id):
             return
         await self.scan_message(message_after, is_edit=True)
 
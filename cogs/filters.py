@@ -24,7 +24,7 @@ class Filter(commands.Cog):
         word = word.lower()
         if kind not in self.bot.wordfilter.kinds:
             return await ctx.send(f"Possible word kinds for word filter: {', '.join(self.bot.wordfilter.kinds)}")
-        if ' ' in word or '-' in word:
+        if ' ' in word or ('-' in word and kind != self.bot.wordfilter.video_kind):
             return await ctx.send("Filtered words cant contain dashes or spaces!")
         if await self.bot.wordfilter.fetch_word(word):
             return await ctx.send("This word is already in the filter!")
@@ -32,6 +32,25 @@ class Filter(commands.Cog):
         await self.bot.channels['mod-logs'].send(f"🆕 **Added**: {ctx.author.mention} added `{entry.word}` to the word filter!")
         await ctx.send("Successfully added word to word filter")
 
+    @is_staff("SuperOP")
+    @wordfilter.command(name='bulkadd')
+    async def bulk_add_words(self, ctx, kind: str, *, words: str = ""):
+        """Adds several words of the same kind at once. Words can also be given in an attached text file, one per line or space separated."""
+        if kind not in self.bot.wordfilter.kinds:
+            return await ctx.send(f"Possible word kinds for word filter: {', '.join(self.bot.wordfilter.kinds)}")
+        words = words.lower().split()
+        for attachment in ctx.message.attachments:
+            words += (await attachment.read()).decode('utf-8', errors='ignore').lower().split()
+        if not words:
+            return await ctx.send("No words were given!")
+        if kind != self.bot.wordfilter.video_kind and any('-' in word for word in words):
+            return await ctx.send("Filtered words cant contain dashes or spaces!")
+        added = await self.bot.wordfilter.add_many(words=words, kind=kind)
+        if not added:
+            return await ctx.send("All the words are already in the filter!")
+        await self.bot.channels['mod-logs'].send(f"🆕 **Added**: {ctx.author.mention} added {len(added)} words to the word filter as `{kind}`!")
+        await ctx.send(f"Successfully added {len(added)} words to word filter")
+
     @wordfilter.command(name='list')
     async def list_words(self, ctx):
         embed = discord.Embed()
@@ -46,12 +65,7 @@ class Filter(commands.Cog):
     @is_staff("SuperOP")
     @wordfilter.command(name='delete', aliases=['remove'])
     async def delete_word(self, ctx, *, words: str):
-        words = words.split()
-        deleted = []
-        for word in words:
-            entry = await self.bot.wordfilter.delete(word=word)
-            if entry:
-                deleted.append(entry.word)
+        deleted = await self.bot.wordfilter.delete_many(words=words.split())
         if deleted:
             await ctx.send(f"Deleted words `{'`,`'.join(deleted)}` succesfully!")
             await self.bot.channels['mod-logs'].send(f"⭕ **Deleted**: {ctx.author.mention} deleted words `{'`,`'.join(deleted)}` from the filter!")
@@ -69,9 +83,9 @@ class Filter(commands.Cog):
     @invitefilter.command(name='add')
     async def add_invite(self, ctx, invite: discord.Invite, alias: str):
         """Adds a invite to the filter whitelist"""
-        if await self.bot.invitefilter.fetch_invite_by_alias(alias) or await self.bot.invitefilter.fetch_invite_by_code(invite.code):
+        if self.bot.invitefilter.get_by_alias(alias) or self.bot.invitefilter.get(invite.code):
             return await ctx.send("This invite code or alias is already in use!")
-        entry = await self.bot.invitefilter.add(code=invite.code, alias=alias, uses=-1)
+        entry = await self.bot.invitefilter.add(code=invite.code, alias=alias, uses=-1, guild_id=invite.guild.id)
         if entry is None:
             return await ctx.send("Failed to add invite to the invite whitelist!")
         await self.bot.channels['mod-logs'].send(f"🆕 **Added**: {ctx.author.mention} added {invite.code}(`{invite.guild.name}`) to the invite whitelist!")
@@ -93,7 +107,7 @@ class Filter(commands.Cog):
         """List invites in the filter whitelist"""
         embed = discord.Embed()
         if self.bot.invitefilter.invites:
-            embed.add_field(name='Invites', value='\n'.join(f"name: {invite.alias} code:{invite.code} uses:{invite.uses}" for invite in self.bot.invitefilter.invites))
+            embed.add_field(name='Invites', value='\n'.join(f"name: {invite.alias} code:{invite.code} uses:{invite.uses}" for invite in self.bot.invitefilter.invites.values()))
             await ctx.send(embed=embed)
         else:
             await ctx.send("The invite filter is empty!")
@@ -153,7 +153,7 @@ class KickBan(commands.Cog):
             days = 0
         try:
             self.bot.actions.append("ub:" + str(member.id))
-            await ctx.cog.remove_timed_restriction(member.id, 'timeban')
+            await crud.remove_timed_restriction(member.id, 'timeban')
             await member.ban(reason=reason, delete_message_days=days)
         except discord.errors.Forbidden:
             await ctx.send("💢 I don't have permission to do this.")
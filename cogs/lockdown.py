@@ -1,7 +1,6 @@
 import discord
 
 from discord.ext import commands
-from utils import crud
 from utils.checks import is_staff, check_staff_id
 
 
@@ -30,9 +29,7 @@ class Lockdown(commands.Cog):
 
         for c in channels:
 
-            dbchannel = await crud.get_dbchannel(c.id)
-            if not dbchannel:
-                dbchannel = await crud.add_dbchannel(c.id, c.name)
+            dbchannel = await self.bot.channelstate.get_or_create(c)
 
             if dbchannel.lock_level > 0:
                 await ctx.send(f"🔒 {c.mention} is already locked down. Use `.unlock` to unlock.")
@@ -73,9 +70,7 @@ class Lockdown(commands.Cog):
 
         for c in channels:
 
-            dbchannel = await crud.get_dbchannel(c.id)
-            if not dbchannel:
-                dbchannel = await crud.add_dbchannel(c.id, c.name)
+            dbchannel = await self.bot.channelstate.get_or_create(c)
 
             if dbchannel.lock_level == 3:
                 await ctx.send(f"🔒 {c.mention} is already locked down. Use `.unlock` to unlock.")
@@ -133,9 +128,7 @@ class Lockdown(commands.Cog):
                 await ctx.send(f"{ctx.author.mention} {c.mention} can't be locked by a helper.")
                 continue
 
-            dbchannel = await crud.get_dbchannel(c.id)
-            if not dbchannel:
-                dbchannel = await crud.add_dbchannel(c.id, c.name)
+            dbchannel = await self.bot.channelstate.get_or_create(c)
 
             if dbchannel.lock_level > 0:
                 await ctx.send(f"🔒 {c.mention} is already locked down. Use `.unlock` to unlock.")
@@ -188,7 +181,7 @@ class Lockdown(commands.Cog):
                 await ctx.send(f"{ctx.author.mention} {c.mention} can't be unlocked by a helper.")
                 continue
 
-            dbchannel = await crud.get_dbchannel(c.id)
+            dbchannel = self.bot.channelstate.get(c.id)
             if not dbchannel or dbchannel.lock_level == 0:
                 await ctx.send("This channel is not locked")
                 continue
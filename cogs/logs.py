@@ -45,8 +45,9 @@ Thanks for stopping by and have a good time!
     @commands.Cog.listener()
     async def on_member_join(self, member):
         await self.bot.wait_until_all_ready()
+        raid = self.bot.raidmonitor.record_join(member)
         msg = f"✅ **Join**: {member.mention} | {self.bot.escape_text(member)}\n🗓 __Creation__: {member.created_at}\n🏷 __User ID__: {member.id}"
-        softban = await crud.get_softban(member.id)
+        softban, role_ids, warns = await crud.get_join_state(member.id)
         if softban:
             message_sent = await send_dm_message(member, f"This account has not been permitted to participate in {self.bot.guild.name}. The reason is: {softban.reason}")
             self.bot.actions.append("sbk:" + str(member.id))
@@ -58,21 +59,29 @@ Thanks for stopping by and have a good time!
             embed.description = softban.reason
             await self.bot.channels['server-logs'].send(msg, embed=embed)
             return
-        perm_roles = await crud.get_permanent_roles(member.id)
-        if perm_roles:
-            roles = []
-            for perm_role in perm_roles:
-                roles.append(member.guild.get_role(perm_role.id))
-            await member.add_roles(*roles)
-
-        warns = await crud.get_warns(member.id)
-        if len(warns) == 0:
+
+        # permanent roles and the roles of every cog are given in a single edit
+        roles = self.bot.joinpipeline.roles_for(member, raid)
+        roles.update(role for role_id in role_ids if (role := member.guild.get_role(role_id)))
+        if roles:
+            if raid:
+                self.bot.raidmonitor.queue_roles(member, roles)
+            else:
+                await member.add_roles(*roles, reason="Join roles", atomic=False)
+
+        if raid:
+            # collapsed into a digest instead of a message per join
+            self.bot.raidmonitor.log_join(f"{member.mention} | {self.bot.escape_text(member)} | {member.id} | created {member.created_at:%Y-%m-%d}"
+                                          + (f" | **{len(warns)} warns**" if warns else ""))
+        elif len(warns) == 0:
             await self.bot.channels['server-logs'].send(msg)
         else:
             embed = discord.Embed(color=discord.Color.dark_red())
             embed.set_author(name=f"Warns for {member}", icon_url=member.avatar_url)
+            issuers = await self.bot.userresolver.resolve_many(warn.issuer for warn in warns)
             for idx, warn in enumerate(warns):
-                embed.add_field(name=f"{idx + 1}: {discord.utils.snowflake_time(warn.id).strftime('%Y-%m-%d %H:%M:%S')}", value=f"Issuer: {self.bot.escape_text((await self.bot.fetch_user(warn.issuer)).display_name)}\nReason: {warn.reason}")
+                issuer = issuers[warn.issuer].display_name if warn.issuer in issuers else str(warn.issuer)
+                embed.add_field(name=f"{idx + 1}: {discord.utils.snowflake_time(warn.id).strftime('%Y-%m-%d %H:%M:%S')}", value=f"Issuer: {self.bot.escape_text(issuer)}\nReason: {warn.reason}")
             await self.bot.channels['server-logs'].send(msg, embed=embed)
         await send_dm_message(member, self.welcome_msg.format(member.name, member.guild.name, self.bot.channels['welcome-and-rules'].mention))
 
@@ -5,9 +5,11 @@ import pytz
 import sys
 import traceback
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from discord.ext import commands
-from utils import crud
+from utils import crud, expiry
+from utils.checks import is_staff
+from utils.utils import gather_actions
 
 
 class Loop(commands.Cog):
@@ -17,46 +19,56 @@ class Loop(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        bot.loop.create_task(self.start_update_loop())
+        # Discord requests made at once when lifting restrictions
+        self.lift_semaphore = asyncio.Semaphore(5)
+        self.tasks = [bot.loop.create_task(self.start_update_loop()), bot.loop.create_task(self.start_expiry_loop())]
 
-    def __unload(self):
+    def cog_unload(self):
         self.is_active = False
+        for job in ('member-count', 'netinfo'):
+            self.bot.jobs.remove(job)
+        for task in self.tasks:
+            task.cancel()
 
     is_active = True
 
-    last_hour = datetime.now().hour
-
-    warning_time_period_ban = timedelta(minutes=30)
-    warning_time_period_mute = timedelta(minutes=10)
-    warning_time_period_nohelp = timedelta(minutes=10)
-    warning_time_period_notech = timedelta(minutes=10)
-    warning_time_period_helpmute = timedelta(minutes=10)
+    # seconds between attempts to load the timed restrictions after a failure
+    expiry_retry_min = 5
+    expiry_retry_max = 300
 
     tz = pytz.timezone('US/Pacific')
 
     netinfo_embed = discord.Embed(description="The Network Maintenance Information page has not been successfully checked yet.")
     # netinfo_future_embed = discord.Embed(description="This needs to be set up")
 
+    netinfo_url = 'https://www.nintendo.co.jp/netinfo/en_US/status.json?callback=getJSON'
+    netinfo_entries = []
+    netinfo_valid_until = datetime(year=2000, month=1, day=1, tzinfo=tz)
+
     def netinfo_parse_time(self, timestr):
         return datetime.strptime(' '.join(timestr.split()), '%A, %B %d, %Y %I :%M %p').replace(tzinfo=self.tz)
 
     async def update_netinfo(self):
-        async with aiohttp.ClientSession() as session:
-            r = await session.get('https://www.nintendo.co.jp/netinfo/en_US/status.json?callback=getJSON')
-            if r.status == 200:
-                j = await r.json()
-            else:
-                # No logging setup :/
-                print(f"Netinfo: {r.status} while trying to update netinfo.")
-                return
+        try:
+            r = await self.bot.webclient.get(self.netinfo_url, cache=True)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Netinfo: {e.__class__.__name__} while trying to update netinfo.")
+            return
+        if r.status != 200:
+            # No logging setup :/
+            print(f"Netinfo: {r.status} while trying to update netinfo.")
+            return
 
         now = datetime.now(self.tz)
-
-        embed = discord.Embed(title="Network Maintenance Information / Online Status",
-                              url="https://www.nintendo.co.jp/netinfo/en_US/index.html",
-                              description="All times are US/Pacific.")
-        embed.set_footer(text=f"This information was last updated {now.strftime('%A, %B %d, %Y %I:%M %p')}.")
-
+        if r.modified:
+            self.netinfo_entries = self.parse_netinfo(r.json())
+        elif now < self.netinfo_valid_until:
+            # nothing changed and no entry started or ended since the embed was built
+            return
+        self.build_netinfo_embed(now)
+
+    def parse_netinfo(self, j):
+        entries = []
         for status_type in ("operational_statuses", "temporary_maintenances"):
             for entry in j[status_type]:
                 if "platform" in entry:
@@ -74,18 +86,27 @@ class Loop(commands.Cog):
                     entry_desc += '\nEnds: ' + end.strftime('%A, %B %d, %Y %I:%M %p')
 
                 descriptor = "Maintenance" if status_type == "temporary_maintenances" else "Status"
+                entry_title = entry["software_title"].replace(' <br />\r\n', ', ')
+                if "services" in entry:
+                    entry_title += ", " + ', '.join(entry["services"])
+                entries.append((descriptor, entry_title, entry_desc, begin, end))
+        return entries
 
-                if now < end:
-                    entry_name = "{} {}: {}".format(
-                        "Current" if begin <= now else "Upcoming",
-                        descriptor,
-                        entry["software_title"].replace(' <br />\r\n', ', ')
-                    )
-                    if "services" in entry:
-                        entry_name += ", " + ', '.join(entry["services"])
-                    embed.add_field(name=entry_name, value=entry_desc, inline=False)
+    def build_netinfo_embed(self, now):
+        embed = discord.Embed(title="Network Maintenance Information / Online Status",
+                              url="https://www.nintendo.co.jp/netinfo/en_US/index.html",
+                              description="All times are US/Pacific.")
+        embed.set_footer(text=f"This information was last updated {now.strftime('%A, %B %d, %Y %I:%M %p')}.")
+
+        valid_until = datetime(year=2099, month=1, day=1, tzinfo=self.tz)
+        for descriptor, entry_title, entry_desc, begin, end in self.netinfo_entries:
+            if now < end:
+                entry_name = f"{'Current' if begin <= now else 'Upcoming'} {descriptor}: {entry_title}"
+                embed.add_field(name=entry_name, value=entry_desc, inline=False)
+                valid_until = min(valid_until, end, begin if begin > now else end)
 
         self.netinfo_embed = embed
+        self.netinfo_valid_until = valid_until
 
     @commands.command()
     @commands.cooldown(rate=1, per=60.0, type=commands.BucketType.channel)
@@ -101,126 +122,125 @@ class Loop(commands.Cog):
         await ctx.send(embed=embed)
 
     async def start_update_loop(self):
-        # thanks Luc#5653
         await self.bot.wait_until_all_ready()
-        await self.update_netinfo()  # Run once so it will always be available after restart
+        self.bot.jobs.cron('member-count', self.post_member_count, minutes=[0], skip_missed=True)
+        # Run once at start so it will always be available after restart
+        self.bot.jobs.cron('netinfo', self.update_netinfo, minutes=[0, 30], run_at_start=True)
+
+    async def post_member_count(self):
+        await self.bot.channels['helpers'].send(f"{self.bot.guild.name} has {self.bot.guild.member_count:,} members at this hour!")
+
+    @is_staff("OP")
+    @commands.command()
+    async def jobs(self, ctx):
+        """Shows the run metrics of the periodic jobs."""
+        embed = discord.Embed(title="Periodic jobs", color=discord.Color.blue())
+        embed.description = '\n'.join(f"`{job.name}`: {job.runs} runs, {job.failures} failures, {job.skipped} skipped, "
+                                      f"last took {job.last_duration:.2f}s with {job.last_lag * 1000:.0f}ms lag "
+                                      f"(max {job.max_lag * 1000:.0f}ms)"
+                                      for job in self.bot.jobs.jobs.values()) or "No jobs are registered."
+        await ctx.send(embed=embed)
+
+    async def start_expiry_loop(self):
+        await self.bot.wait_until_all_ready()
+        seeded = False
+        retry_delay = self.expiry_retry_min
         while self.is_active:
+            if not seeded:
+                try:
+                    await self.seed_expiry_scheduler()
+                except Exception as e:
+                    print(f'Failed to seed the expiry scheduler, retrying in {retry_delay}s', file=sys.stderr)
+                    traceback.print_tb(e.__traceback__)
+                    print(f'{e.__class__.__name__}: {e}', file=sys.stderr)
+                    await asyncio.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, self.expiry_retry_max)
+                    continue
+                seeded = True
+                retry_delay = self.expiry_retry_min
+            due = await expiry.scheduler.wait()
             try:
-                current_timestamp = datetime.now()
-
-                timebans = await crud.get_time_restrictions_by_type('timeban')
-                timemutes = await crud.get_time_restrictions_by_type('timemute')
-                timenohelps = await crud.get_time_restrictions_by_type('timenohelp')
-                timenotechs = await crud.get_time_restrictions_by_type('timenotech')
-                timehelpmutes = await crud.get_time_restrictions_by_type('timehelpmute')
-                timedroles = await crud.get_timed_roles()
-
-                for timeban in timebans:
-                    unban_time = timeban.end_date
-                    if current_timestamp > unban_time:
-                        user = await self.bot.fetch_user(timeban.user)
-                        self.bot.actions.append("tbr:" + str(timeban.user))
-                        try:
-                            await self.bot.guild.unban(user)
-                        except discord.errors.NotFound:
-                            pass
-                        msg = f"⚠️ **Ban expired**: {user.mention} | {user}"
-                        await self.bot.channels['mod-logs'].send(msg)
-                        await crud.remove_timed_restriction(user.id, 'timeban')
-                    elif not timeban.alerted:
-                        warning_time = unban_time - self.warning_time_period_ban
-                        if current_timestamp > warning_time:
-                            await crud.set_time_restriction_alert(timeban.user, 'timeban')
-                            user = await self.bot.fetch_user(timeban.user)
-                            await self.bot.channels['mods'].send(f"**Note**: {user.id} will be unbanned in {((unban_time - current_timestamp).seconds // 60) + 1} minutes.")
-
-                for timemute in timemutes:
-                    unmute_time = timemute.end_date
-                    if current_timestamp > unmute_time:
-                        await crud.remove_timed_restriction(timemute.user, "timemute")
-                        await crud.remove_permanent_role(timemute.user, self.bot.roles['Muted'].id)
-                        msg = f"🔈 **Mute expired**: <@{timemute.user}>"
-                        await self.bot.channels['mod-logs'].send(msg)
-                        member = self.bot.guild.get_member(timemute.user)
-                        if member:
-                            await member.remove_roles(self.bot.roles['Muted'])
-                    elif not timemute.alerted:
-                        warning_time = unmute_time - self.warning_time_period_mute
-                        if current_timestamp > warning_time:
-                            await crud.set_time_restriction_alert(timemute.user, 'timemute')
-                            user = await self.bot.fetch_user(timemute.user)
-                            await self.bot.channels['mods'].send(f"**Note**: <@{user.id}> will be unmuted in {((unmute_time - current_timestamp).seconds // 60) + 1} minutes.")
-
-                for timenohelp in timenohelps:
-                    if current_timestamp > timenohelp.end_date:
-                        await crud.remove_timed_restriction(timenohelp.user, "timenohelp")
-                        await crud.remove_permanent_role(timenohelp.user, self.bot.roles['No-Help'].id)
-                        msg = f"⭕️ **No-Help Restriction expired**: <@{timenohelp.user}>"
-                        await self.bot.channels['mod-logs'].send(msg)
-                        await self.bot.channels['helpers'].send(msg)
-                        member = self.bot.guild.get_member(timenohelp.user)
-                        if member:
-                            await member.remove_roles(self.bot.roles['No-Help'])
-                    elif not timenohelp.alerted:
-                        warning_time = timenohelp.end_date - self.warning_time_period_nohelp
-                        if current_timestamp > warning_time:
-                            await crud.set_time_restriction_alert(timenohelp.user, 'timenohelp')
-                            await self.bot.channels['helpers'].send(f"**Note**: <@{timenohelp.user}> no-help restriction will expire in {((timenohelp.end_date - current_timestamp).seconds // 60) + 1} minutes.")
-
-                for timehelpmute in timehelpmutes:
-                    if current_timestamp > timehelpmute.end_date:
-                        await crud.remove_timed_restriction(timehelpmute.user, "timehelpmute")
-                        await crud.remove_permanent_role(timehelpmute.user, self.bot.roles['help-mute'].id)
-                        msg = f"⭕️ **Help Mute expired**: <@{timehelpmute.user}>"
-                        await self.bot.channels['mod-logs'].send(msg)
-                        await self.bot.channels['helpers'].send(msg)
-                        member = self.bot.guild.get_member(timehelpmute.user)
-                        if member:
-                            await member.remove_roles(self.bot.roles['help-mute'])
-                    elif not timehelpmute.alerted:
-                        warning_time = timehelpmute.end_date - self.warning_time_period_helpmute
-                        if current_timestamp > warning_time:
-                            await crud.set_time_restriction_alert(timehelpmute.user, 'timehelpmute')
-                            await self.bot.channels['helpers'].send(f"**Note**: <@{timehelpmute.user}> help mute will expire in {((timehelpmute.end_date - current_timestamp).seconds // 60) + 1} minutes.")
-
-                for timenotech in timenotechs:
-                    if current_timestamp > timenotech.end_date:
-                        await crud.remove_timed_restriction(timenotech.user, "timenotech")
-                        await crud.remove_permanent_role(timenotech.user, self.bot.roles['No-Tech'].id)
-                        msg = f"⭕️ **No-Tech Restriction expired**: <@{timenotech.user}>"
-                        await self.bot.channels['mod-logs'].send(msg)
-                        await self.bot.channels['helpers'].send(msg)
-                        member = self.bot.guild.get_member(timenotech.user)
-                        if member:
-                            await member.remove_roles(self.bot.roles['No-Tech'])
-                    elif not timenotech.alerted:
-                        warning_time = timenotech.end_date - self.warning_time_period_notech
-                        if current_timestamp > warning_time:
-                            await crud.set_time_restriction_alert(timenotech.user, 'timenotech')
-                            await self.bot.channels['helpers'].send(f"**Note**: <@{timenotech.user}> no-tech restriction will expire in {((timenotech.end_date - current_timestamp).seconds // 60) + 1} minutes.")
-
-                for timedrole in timedroles:
-                    if current_timestamp > timedrole.expiring_date:
-                        await crud.remove_timed_role(timedrole.user_id, timedrole.role_id)
-                        member = self.bot.guild.get_member(timedrole.user_id)
-                        role = self.bot.guild.get_role(timedrole.role_id)
-                        if member and role:
-                            await member.remove_roles(role)
-                        msg = f"⭕ **Timed Role Expired**: <@{timedrole.user_id}>"
-                        await self.bot.channels['mod-logs'].send(msg)
-
-                if current_timestamp.minute == 0 and current_timestamp.hour != self.last_hour:
-                    await self.bot.channels['helpers'].send(f"{self.bot.guild.name} has {self.bot.guild.member_count:,} members at this hour!")
-                    self.last_hour = current_timestamp.hour
-
-                if current_timestamp.minute % 30 == 0 and current_timestamp.second == 0:
-                    self.bot.loop.create_task(self.update_netinfo())
+                # every due restriction is lifted at once, no matter which key woke us
+                if any(key[0] == 'expire' for key in due):
+                    await self.expire_restrictions()
+                for key in due:
+                    if key[0] == 'role':
+                        await self.expire_timed_role(key[2], key[1])
+                    elif key[0] == 'alert':
+                        await self.alert_restriction(key[2], key[1])
             except Exception as e:
-                print('Ignoring exception in start_update_loop', file=sys.stderr)
+                print('Ignoring exception in start_expiry_loop', file=sys.stderr)
                 traceback.print_tb(e.__traceback__)
                 print(f'{e.__class__.__name__}: {e}', file=sys.stderr)
-            finally:
-                await asyncio.sleep(1)
+                # the failed keys already left the scheduler, they are read again from the database
+                seeded = False
+
+    async def seed_expiry_scheduler(self):
+        # catch up on what expired while the bot was down before seeding the scheduler
+        await self.expire_restrictions()
+        # the scheduler is kept up to date by crud, the database is only read again after a failure
+        # cleared first, anything the crud hooks schedule meanwhile is also read from the database
+        expiry.scheduler.clear()
+        restrictions = await crud.get_time_restrictions()
+        timed_roles = await crud.get_timed_roles()
+        for restriction in restrictions:
+            expiry.scheduler.add_restriction(restriction.user, restriction.type, restriction.end_date, restriction.alerted)
+        for timed_role in timed_roles:
+            expiry.scheduler.add_timed_role(timed_role.user_id, timed_role.role_id, timed_role.expiring_date)
+
+    async def expire_restrictions(self):
+        role_ids = {restriction.type: self.bot.roles[restriction.role].id
+                    for restriction in expiry.restriction_types.values() if not restriction.unban}
+        expired = await crud.expire_timed_restrictions(datetime.now(), role_ids)
+        await gather_actions(*(self.lift_restriction(row.user, expiry.restriction_types[row.type])
+                               for row in expired if row.type in expiry.restriction_types))
+
+    async def lift_restriction(self, user_id: int, restriction: expiry.RestrictionType):
+        name = str(user_id)
+        async with self.lift_semaphore:
+            if restriction.unban:
+                # the row is already gone, so the unban can't depend on the user still being fetchable
+                self.bot.actions.append("tbr:" + str(user_id))
+                try:
+                    await self.bot.guild.unban(discord.Object(id=user_id))
+                except discord.errors.NotFound:
+                    pass
+                try:
+                    name = str(await self.bot.userresolver.resolve(user_id))
+                except discord.HTTPException:
+                    pass
+            else:
+                member = self.bot.guild.get_member(user_id)
+                if member:
+                    await member.remove_roles(self.bot.roles[restriction.role])
+        msg = restriction.expired_message.format(user_id=user_id, name=name)
+        for channel in restriction.log_channels:
+            self.bot.logdispatcher.send(self.bot.channels[channel], msg)
+
+    async def alert_restriction(self, user_id: int, type: str):
+        restriction = await crud.get_time_restrictions_by_user_type(user_id, type)
+        current_timestamp = datetime.now()
+        if not restriction or restriction.alerted or restriction.end_date <= current_timestamp:
+            return
+        await crud.set_time_restriction_alert(user_id, type)
+        minutes = ((restriction.end_date - current_timestamp).seconds // 60) + 1
+        restriction_type = expiry.restriction_types[type]
+        await self.bot.channels[restriction_type.alert_channel].send(
+            restriction_type.alert_message.format(user_id=user_id, minutes=minutes))
+
+    async def expire_timed_role(self, user_id: int, role_id: int):
+        timed_role = await crud.get_time_role_by_user_type(user_id, role_id)
+        if not timed_role:
+            return
+        if timed_role.expiring_date > datetime.now():
+            return expiry.scheduler.add_timed_role(user_id, role_id, timed_role.expiring_date)
+        await crud.remove_timed_role(user_id, role_id)
+        member = self.bot.guild.get_member(user_id)
+        role = self.bot.guild.get_role(role_id)
+        if member and role:
+            await member.remove_roles(role)
+        msg = f"⭕ **Timed Role Expired**: <@{user_id}>"
+        await self.bot.channels['mod-logs'].send(msg)
 
 
 def setup(bot):
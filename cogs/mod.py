@@ -751,6 +751,7 @@ class Mod(commands.Cog):
             await ctx.send("Invalid channel name!")
             return
         await models.Channel.update.values(id=channel.id).where(models.Channel.name == name).gino.status()
+        await self.bot.channelstate.load()
         self.bot.channels[name] = channel
         await ctx.send(f"Changed {name} channel to {channel.mention} | {channel.id}")
         await self.bot.channels['server-logs'].send(f"⚙ **Changed**: {ctx.author.mention} changed {name} channel to {channel.mention} | {channel.id}")
@@ -760,7 +761,7 @@ class Mod(commands.Cog):
     @commands.command()
     async def setmodchannel(self, ctx, channel: discord.TextChannel, value: bool):
         """Changes the mod flag of a channel"""
-        dbchannel = await crud.get_dbchannel(channel.id)
+        dbchannel = await self.bot.channelstate.get_or_create(channel)
         await dbchannel.update(mod_channel=value).apply()
         await ctx.send(f"{channel.mention} is {'now' if value else 'no longer'} a mod channel.")
 
@@ -796,9 +797,9 @@ class Mod(commands.Cog):
     @commands.command()
     async def nofilter(self, ctx, channel: discord.TextChannel):
         """Adds nofilter to the channel"""
-        if await crud.check_nofilter(channel):
+        if self.bot.channelstate.is_nofilter(channel):
             return await ctx.send("This channel is already no filtered!")
-        await crud.add_nofilter(channel)
+        await self.bot.channelstate.add_nofilter(channel)
         await self.bot.channels['mod-logs'].send(f"⭕ **No filter**: {ctx.author.mention} added no filter to {channel.mention}")
 
     @is_staff("SuperOP")
@@ -806,9 +807,9 @@ class Mod(commands.Cog):
     @commands.command()
     async def filter(self, ctx, channel: discord.TextChannel):
         """Removes nofilter from the channel"""
-        if not await crud.check_nofilter(channel):
+        if not self.bot.channelstate.is_nofilter(channel):
             return await ctx.send("This channel is already filtered!")
-        await crud.remove_nofilter(channel)
+        await self.bot.channelstate.remove_nofilter(channel)
         await self.bot.channels['mod-logs'].send(f"🚫 **Filter**: {ctx.author.mention} removed no filter from {channel.mention}")
 
     @is_staff("Helper")
@@ -819,13 +820,13 @@ class Mod(commands.Cog):
 
         code = invite.code
 
-        if await self.bot.invitefilter.fetch_invite_by_alias(alias) or await self.bot.invitefilter.fetch_invite_by_code(code):
+        if self.bot.invitefilter.get_by_alias(alias) or self.bot.invitefilter.get(code):
             return await ctx.send("This code or alias is already in use!")
 
         if times < 1:
             return await ctx.send("The invite must be approved for a number of times higher than 0")
 
-        await self.bot.invitefilter.add(code=code, alias=alias, uses=times)
+        await self.bot.invitefilter.add(code=code, alias=alias, uses=times, guild_id=invite.guild.id)
         await ctx.send(f"Approved an invite to {invite.guild}({code}) for posting {times} times")
         await self.bot.channels['mod-logs'].send(f"⭕ **Approved**: {ctx.author.mention} approved server {invite.guild}({code}) to be posted {times} times")
 
@@ -833,9 +834,7 @@ class Mod(commands.Cog):
     @commands.command(aliases=['setrole', 'scr'])
     async def setchannelrole(self, ctx, channel: discord.TextChannel, role: discord.Role):
         """Sets the default role of a channel."""
-        dbchannel = await models.Channel.get(channel.id)
-        if not dbchannel:
-            dbchannel = await crud.add_dbchannel(channel.id, channel.name)
+        dbchannel = await self.bot.channelstate.get_or_create(channel)
         if not await models.Role.get(role.id):
             await crud.add_dbrole(role.id, role.name)
         await dbchannel.update(default_role=role.id).apply()
@@ -848,7 +847,7 @@ class Mod(commands.Cog):
         state = {0: "Not locked", 1: "softlocked", 2: "locked", 3: "super locked"}
         if not channel:
             channel = ctx.channel
-        dbchannel = await models.Channel.get(channel.id)
+        dbchannel = self.bot.channelstate.get(channel.id)
         if not dbchannel:
             return await ctx.send("This channel is not in the database")
         role = await crud.get_dbrole(dbchannel.default_role) if dbchannel.default_role else ctx.guild.default_role
@@ -2,7 +2,7 @@ import discord
 
 from discord.ext import commands
 from utils import crud
-from utils.checks import is_staff, staff_ranks
+from utils.checks import is_staff, staff_ranks, staff_roster
 
 
 class ModStaff(commands.Cog):
@@ -86,11 +86,11 @@ class ModStaff(commands.Cog):
         for staffmember in await crud.get_staff_all():
             if ctx.guild.get_member(staffmember.id) is None:
                 await crud.remove_staff(staffmember.id)
-                removed.append(await self.bot.fetch_user(staffmember.id))
+                removed.append(await self.bot.userresolver.resolve(staffmember.id))
         for helper in await crud.get_helpers():
             if ctx.guild.get_member(helper.id) is None:
                 await crud.remove_helper(helper.id)
-                removed.append(await self.bot.fetch_user(helper.id))
+                removed.append(await self.bot.userresolver.resolve(helper.id))
         if not removed:
             await ctx.send("Updated Staff list, no staff removed!")
         else:
@@ -99,6 +99,14 @@ class ModStaff(commands.Cog):
             modmsg = f"🛠 **Updated Staff list**: {ctx.author.mention} updated the staff list.\n:pencil: __Users removed__: {', '.join([f'{x.id} | {x}'for x in removed])}"
             await self.bot.channels['mod-logs'].send(modmsg)
 
+    @is_staff("OP")
+    @commands.command(hidden=True)
+    async def refreshroster(self, ctx):
+        """Reloads the cached staff roster used by the permission checks."""
+        staff_roster.invalidate()
+        await staff_roster.refresh()
+        await ctx.send(f"Staff roster reloaded, {len(staff_roster.members)} entries.")
+
     @commands.command()
     async def liststaff(self, ctx):
         """List staff members per rank."""
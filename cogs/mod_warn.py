@@ -114,12 +114,14 @@ class ModWarn(commands.Cog):
         embed.set_author(name=f"Warns for {member}", icon_url=member.avatar_url)
         warns = await crud.get_warns(member.id)
         if warns:
-            dbchannel = await crud.get_dbchannel(ctx.channel.id)
+            dbchannel = self.bot.channelstate.get(ctx.channel.id)
+            show_issuer = dbchannel and dbchannel.is_mod_channel
+            # issuers are only needed in mod channels, fetched together
+            issuers = await self.bot.userresolver.resolve_many(warn.issuer for warn in warns) if show_issuer else {}
             for idx, warn in enumerate(warns):
-                issuer = await ctx.get_user(warn.issuer)
                 value = ""
-                if dbchannel and dbchannel.is_mod_channel:
-                    value += f"Issuer: {issuer.name}\n"
+                if show_issuer:
+                    value += f"Issuer: {issuers[warn.issuer].name if warn.issuer in issuers else warn.issuer}\n"
                 value += f"Reason: {warn.reason} "
                 embed.add_field(name=f"{idx + 1}: {discord.utils.snowflake_time(warn.id).strftime('%Y-%m-%d %H:%M:%S')}", value=value)
         else:
@@ -1,7 +1,7 @@
 import discord
 
 from discord.ext import commands
-from utils import utils, crud
+from utils import utils
 from utils.checks import is_staff
 
 
@@ -21,10 +21,10 @@ class Modwatch(commands.Cog):
     @is_staff("Helper")
     @commands.command()
     async def watch(self, ctx, member: discord.Member, *, reason=""):
-        if await crud.is_watched(member.id):
+        if self.bot.watchlist.is_watched(member.id):
             await ctx.send("User is already being watched!")
             return
-        await crud.add_watch(member.id)
+        await self.bot.watchlist.add(member.id)
         await ctx.send(f"{member.mention} is being watched.")
         msg = f"👀 **Watch**: {ctx.author.mention} put {member.mention} on watch | {member}"
         if reason != "":
@@ -39,15 +39,21 @@ class Modwatch(commands.Cog):
     @is_staff("Helper")
     @commands.command()
     async def unwatch(self, ctx, member: discord.Member):
-        if not await crud.is_watched(member.id):
+        if not self.bot.watchlist.is_watched(member.id):
             await ctx.send("This user was not being watched.")
             return
-        await crud.remove_watch(member.id)
+        await self.bot.watchlist.remove(member.id)
         await ctx.send(f"{member.mention} is no longer being watched.")
         msg = f"❌ **Unwatch**: {ctx.author.mention} removed {member.mention} from watch | {self.bot.escape_text(member)}"
         await self.bot.channels['mod-logs'].send(msg)
         await self.bot.channels['watch-logs'].send(msg)
 
+    @is_staff("Helper")
+    @commands.command()
+    async def watchcount(self, ctx):
+        """Shows how many users are being watched."""
+        await ctx.send(f"{self.bot.watchlist.count} users are being watched.")
+
 
 def setup(bot):
     bot.add_cog(Modwatch(bot))
@@ -16,8 +16,13 @@ class Newcomers(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.autoprobate = False
+        self.bot.joinpipeline.register('probation', self.join_roles)
         self.bot.loop.create_task(self.init())  # We can't do proper init here.
 
+    def cog_unload(self):
+        self.bot.joinpipeline.unregister('probation')
+
     async def init(self):
         await self.bot.wait_until_all_ready()
         flag_name = 'auto_probation'
@@ -28,10 +33,9 @@ class Newcomers(commands.Cog):
             self.autoprobate = False
             await crud.add_flag(flag_name)
 
-    @commands.Cog.listener()
-    async def on_member_join(self, member):
-        if self.autoprobate:
-            await member.add_roles(self.bot.roles['Probation'], reason="Auto-probation")
+    def join_roles(self, member, raid: bool):
+        # members joining during a raid are probated even if auto-probation is off
+        return [self.bot.roles['Probation']] if self.autoprobate or raid else []
 
     async def autoprobate_handler(self, ctx, enabled: bool = None):
         if enabled is not None:
@@ -40,7 +44,8 @@ class Newcomers(commands.Cog):
 
         inactive_text = f'**inactive**. ⚠️\nTo activate it, use `.autoprobate {" | ".join(self.on_aliases)}`.'
         active_text = f'**active**. ✅\nTo deactivate it, use `.autoprobate {" | ".join(self.off_aliases)}`.'
-        await ctx.send(f'🔨 Auto-probation is {active_text if self.autoprobate else inactive_text}')
+        raid_text = '\n🚨 Raid mode is **active**, new members are being probated automatically.' if self.bot.raidmonitor.active else ''
+        await ctx.send(f'🔨 Auto-probation is {active_text if self.autoprobate else inactive_text}{raid_text}')
 
     @is_staff('Helper')
     @commands.group(aliases=['autoprobation'], invoke_without_command=True, case_insensitive=True)
@@ -21,9 +21,16 @@ import sys
 
 from utils import models, crud
 from utils.checks import check_staff_id
-from utils.manager import WordFilterManager, InviteFilterManager
+from utils.inviteresolver import InviteResolver
+from utils.jobs import JobScheduler
+from utils.joins import JoinPipeline
+from utils.logdispatch import LogDispatcher
+from utils.manager import WordFilterManager, InviteFilterManager, WatchManager, ChannelStateManager
 from utils.models import db
+from utils.raid import RaidMonitor
+from utils.userresolver import UserResolver
 from utils.utils import create_error_embed, paginate_message
+from utils.webclient import WebClient
 
 IS_DOCKER = os.environ.get('IS_DOCKER', '')
 
@@ -89,7 +96,7 @@ class CustomContext(commands.Context):
         if self.guild and (user := self.guild.get_member(userid)):
             return user
         else:
-            return await self.bot.fetch_user(userid)
+            return await self.bot.userresolver.resolve(userid)
 
 
 class Kurisu(commands.Bot):
@@ -170,6 +177,14 @@ class Kurisu(commands.Bot):
             'hardware': None,
         }
 
+        self.jobs = JobScheduler(self.loop)
+        self.logdispatcher = LogDispatcher(self.loop)
+        self.inviteresolver = InviteResolver(self)
+        self.userresolver = UserResolver(self)
+        self.raidmonitor = RaidMonitor(self)
+        self.joinpipeline = JoinPipeline()
+        self.webclient = WebClient()
+
         self.failed_cogs = []
         self.exitcode = 0
         self._is_all_ready = Event()
@@ -248,6 +263,9 @@ class Kurisu(commands.Bot):
         await self.load_channels()
         await self.load_roles()
 
+        self.channelstate = ChannelStateManager()
+        await self.channelstate.load()
+
         self.assistance_channels = {
             self.channels['3ds-assistance-1'],
             self.channels['3ds-assistance-2'],
@@ -278,6 +296,11 @@ class Kurisu(commands.Bot):
 
         self.invitefilter = InviteFilterManager()
         await self.invitefilter.load()
+        self.jobs.every('invite-uses', self.invitefilter.flush_interval, self.invitefilter.flush)
+        self.loop.create_task(self.invitefilter.backfill_guilds(self.inviteresolver))
+
+        self.watchlist = WatchManager()
+        await self.watchlist.load()
 
         startup_message = f'{self.user.name} has started! {self.guild} has {self.guild.member_count:,} members!'
         if len(self.failed_cogs) != 0:
@@ -358,6 +381,12 @@ class Kurisu(commands.Bot):
 
     async def close(self):
         print('Kurisu is shutting down')
+        self.jobs.close()
+        self.raidmonitor.close()
+        await self.logdispatcher.close()
+        if hasattr(self, 'invitefilter'):
+            await self.invitefilter.flush()
+        await self.webclient.close()
         await db.pop_bind().close()
         await super().close()
 
@@ -0,0 +1,35 @@
+from utils.automaton import WordAutomaton
+
+
+def test_finds_overlapping_words():
+    automaton = WordAutomaton(dict.fromkeys(('he', 'she', 'his', 'hers')))
+    assert automaton.search('ushers') == {'he', 'she', 'hers'}
+    assert automaton.search('this') == {'his'}
+    assert automaton.search('nothing') == set()
+
+
+def test_failure_links_across_shared_prefixes():
+    automaton = WordAutomaton(dict.fromkeys(('abcd', 'bce', 'c')))
+    assert automaton.search('abce') == {'bce', 'c'}
+
+
+def test_words_keep_their_values():
+    automaton = WordAutomaton({'freeshop': ('freeshop', 'piracy tool')})
+    assert automaton.words['freeshop'] == ('freeshop', 'piracy tool')
+
+
+def test_rebuilding_without_a_word_drops_its_nodes():
+    words = dict.fromkeys(('piracy', 'pirate', 'tool'))
+    full = WordAutomaton(words)
+    del words['pirate']
+    smaller = WordAutomaton(words)
+    assert smaller.search('pirate tool') == {'tool'}
+    assert len(smaller.goto) == len(full.goto) - 2
+    # the old snapshot is untouched
+    assert full.search('pirate') == {'pirate'}
+
+
+def test_empty_automaton():
+    automaton = WordAutomaton()
+    assert automaton.search('anything') == set()
+    assert len(automaton) == 0
@@ -0,0 +1,67 @@
+import asyncio
+
+from datetime import datetime, timedelta
+from utils.expiry import ExpiryScheduler, restriction_types
+
+
+def test_pop_due_in_deadline_order():
+    scheduler = ExpiryScheduler()
+    now = datetime.now()
+    scheduler.schedule('b', now - timedelta(seconds=1))
+    scheduler.schedule('a', now - timedelta(seconds=2))
+    scheduler.schedule('c', now + timedelta(hours=1))
+    assert scheduler.pop_due(now) == ['a', 'b']
+    assert scheduler.next_deadline() == now + timedelta(hours=1)
+
+
+def test_rescheduling_replaces_the_deadline():
+    scheduler = ExpiryScheduler()
+    now = datetime.now()
+    scheduler.schedule('a', now - timedelta(seconds=1))
+    scheduler.schedule('a', now + timedelta(minutes=5))
+    assert scheduler.pop_due(now) == []
+    assert scheduler.next_deadline() == now + timedelta(minutes=5)
+
+
+def test_cancelled_keys_are_skipped():
+    scheduler = ExpiryScheduler()
+    now = datetime.now()
+    scheduler.schedule('a', now - timedelta(seconds=1))
+    scheduler.cancel('a')
+    assert scheduler.pop_due(now) == []
+    assert scheduler.next_deadline() is None
+
+
+def test_restriction_schedules_alert_before_expiry():
+    scheduler = ExpiryScheduler()
+    end = datetime.now() + timedelta(hours=1)
+    scheduler.add_restriction(1, 'timeban', end)
+    assert scheduler.deadlines[('expire', 'timeban', 1)] == end
+    assert scheduler.deadlines[('alert', 'timeban', 1)] == end - restriction_types['timeban'].warning_period
+    scheduler.remove_restriction(1, 'timeban')
+    assert scheduler.next_deadline() is None
+
+
+def test_alerted_restriction_has_no_alert():
+    scheduler = ExpiryScheduler()
+    scheduler.add_restriction(1, 'timemute', datetime.now() + timedelta(hours=1), alerted=True)
+    assert ('alert', 'timemute', 1) not in scheduler.deadlines
+
+
+def test_stale_entries_are_compacted():
+    scheduler = ExpiryScheduler()
+    now = datetime.now()
+    for i in range(200):
+        scheduler.schedule('a', now + timedelta(seconds=i))
+    assert len(scheduler.heap) <= 2 * len(scheduler.deadlines) + 64
+
+
+def test_wait_wakes_up_for_an_earlier_deadline():
+    async def run():
+        scheduler = ExpiryScheduler()
+        scheduler.schedule('late', datetime.now() + timedelta(hours=1))
+        waiter = asyncio.create_task(scheduler.wait())
+        await asyncio.sleep(0.01)
+        scheduler.schedule('soon', datetime.now() + timedelta(milliseconds=20))
+        return await asyncio.wait_for(waiter, 1)
+    assert asyncio.run(run()) == ['soon']
@@ -0,0 +1,35 @@
+from utils.fingerprint import FingerprintIndex, FingerprintRecord, similarity, sketch
+
+spam = 'free nitro for everyone who clicks this totally legit link'
+
+
+def record(i, text, timestamp=None):
+    return FingerprintRecord(i, 1, i, float(i) if timestamp is None else timestamp, sketch(text))
+
+
+def test_similarity_of_near_duplicates():
+    assert similarity(sketch(spam), sketch(spam)) == 1.0
+    assert similarity(sketch(spam), sketch(spam + '!')) > 0.5
+    assert similarity(sketch(spam), sketch('completely unrelated message about homebrew')) < 0.5
+
+
+def test_flood_is_reported_at_threshold_then_per_copy():
+    index = FingerprintIndex(window=30, threshold=3)
+    results = [index.add(record(i, spam)) for i in range(5)]
+    assert [len(r) for r in results] == [0, 0, 3, 1, 1]
+    flood = results[2][0].flood
+    assert all(r[0].flood is flood for r in results[2:])
+    assert flood.size == 5
+
+
+def test_new_flood_after_the_window():
+    index = FingerprintIndex(window=10, threshold=2)
+    first = index.add(record(0, spam)) or index.add(record(1, spam))
+    second = index.add(record(2, spam, timestamp=100.0)) or index.add(record(3, spam, timestamp=101.0))
+    assert first[0].flood is not second[0].flood
+
+
+def test_different_messages_dont_flood():
+    index = FingerprintIndex(window=30, threshold=2)
+    assert index.add(record(0, spam)) == []
+    assert index.add(record(1, 'how do I install homebrew on my 3ds')) == []
@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+import time
+
+from datetime import datetime
+from utils.jobs import Job, JobScheduler
+
+
+async def noop():
+    pass
+
+
+def test_interval_deadlines_dont_drift():
+    job = Job('a', noop, interval=10)
+    # a run that started 3 seconds late still keeps the next run on the original grid
+    assert job.next_deadline(100.0, 103.0) == 110.0
+
+
+def test_missed_interval_runs_are_collapsed():
+    job = Job('a', noop, interval=10)
+    assert job.next_deadline(100.0, 135.0) == 140.0
+
+
+def test_cron_next_time():
+    job = Job('a', noop, minutes=[0, 30])
+    assert job.next_time(datetime(2021, 1, 1, 10, 0)) == datetime(2021, 1, 1, 10, 30)
+    assert job.next_time(datetime(2021, 1, 1, 10, 45, 12)) == datetime(2021, 1, 1, 11, 0)
+    hourly = Job('b', noop, minutes=[0], hours=[3])
+    assert hourly.next_time(datetime(2021, 1, 1, 4, 0)) == datetime(2021, 1, 2, 3, 0)
+
+
+def test_overlapping_runs_are_skipped_and_failures_counted():
+    async def run():
+        scheduler = JobScheduler(asyncio.get_running_loop())
+
+        async def slow():
+            await asyncio.sleep(0.12)
+
+        async def broken():
+            raise RuntimeError
+
+        slow_job = scheduler.every('slow', 0.05, slow, run_at_start=True)
+        broken_job = scheduler.every('broken', 0.05, broken, run_at_start=True)
+        await asyncio.sleep(0.33)
+        scheduler.close()
+        return slow_job, broken_job
+    slow_job, broken_job = asyncio.run(run())
+    assert slow_job.skipped > 0
+    assert slow_job.runs + slow_job.skipped >= 5
+    assert broken_job.failures == broken_job.runs > 0
+
+
+def test_late_runs_are_skipped_with_skip_missed():
+    async def run():
+        scheduler = JobScheduler(asyncio.get_running_loop())
+        job = scheduler.every('a', 0.05, noop, grace=0.01, skip_missed=True, run_at_start=True)
+        await asyncio.sleep(0)
+        # block the event loop past the grace period
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        scheduler.close()
+        return job
+    job = asyncio.run(run())
+    assert job.skipped >= 1
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'interval': 1, 'minutes': [0]}])
+def test_a_job_needs_one_schedule(kwargs):
+    with pytest.raises(ValueError):
+        Job('a', noop, **kwargs)
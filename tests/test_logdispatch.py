@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+
+discord = pytest.importorskip('discord')
+
+from utils.logdispatch import LogDispatcher  # noqa: E402
+
+
+class FakeChannel:
+    def __init__(self):
+        self.id = 1
+        self.sent = []
+
+    async def send(self, content=None, *, embed=None, allowed_mentions=None):
+        self.sent.append((content, embed))
+
+
+def dispatch(entries, **kwargs):
+    async def run():
+        dispatcher = LogDispatcher(asyncio.get_running_loop(), flush_interval=0.01, **kwargs)
+        channel = FakeChannel()
+        for content, embed in entries:
+            dispatcher.send(channel, content, embed=embed)
+        await asyncio.sleep(0.1)
+        await dispatcher.close()
+        return channel.sent
+    return asyncio.run(run())
+
+
+def test_embed_burst_is_packed():
+    entries = [(f"🗑️ **Deleted message** {i}", discord.Embed(description=f"message {i}")) for i in range(10)]
+    sent = dispatch(entries)
+    assert len(sent) == 1
+    content, embed = sent[0]
+    assert len(embed.fields) == 10
+    assert "message 3" in embed.fields[3].value
+    assert "Deleted message** 3" in embed.fields[3].value
+
+
+def test_plain_text_burst_is_joined():
+    sent = dispatch([(f"line {i}", None) for i in range(5)])
+    assert sent == [('\n'.join(f"line {i}" for i in range(5)), None)]
+
+
+def test_single_embed_is_sent_unchanged():
+    embed = discord.Embed(title="Upload", description="file.zip")
+    sent = dispatch([("uploaded", embed)])
+    assert len(sent) == 1
+    assert sent[0][0] == "uploaded"
+    assert sent[0][1].title == "Upload"
+
+
+def test_embeds_with_images_are_not_packed():
+    entries = []
+    for i in range(3):
+        embed = discord.Embed(description=str(i))
+        embed.set_image(url=f"https://example.com/{i}.png")
+        entries.append((None, embed))
+    assert len(dispatch(entries)) == 3
+
+
+def test_packing_respects_embed_size():
+    entries = [(None, discord.Embed(description='x' * 1000)) for i in range(10)]
+    sent = dispatch(entries)
+    assert 1 < len(sent) < 10
+    assert all(len(embed) <= 6000 for _, embed in sent)
+
+
+def test_long_embeds_are_sent_uncut():
+    embed = discord.Embed(description='x' * 1500)
+    sent = dispatch([("first", discord.Embed(description="short")), ("long", embed)])
+    assert len(sent) == 2
+    assert sent[1][0] == "long"
+    assert sent[1][1].description == 'x' * 1500
+
+
+def test_embeds_with_fields_are_not_flattened():
+    entries = []
+    for i in range(3):
+        embed = discord.Embed(title="Deleted messages")
+        embed.add_field(name="#general", value=f"message {i}")
+        entries.append((None, embed))
+    sent = dispatch(entries)
+    assert len(sent) == 3
+    assert [embed.fields[0].value for _, embed in sent] == [f"message {i}" for i in range(3)]
+
+
+def test_order_is_kept():
+    entries = [("line 0", None), ("embedded", discord.Embed(title="Deleted messages").add_field(name="a", value="b")),
+               ("line 1", None), ("line 2", None)]
+    sent = dispatch(entries)
+    assert [content for content, _ in sent] == ["line 0", "embedded", "line 1\nline 2"]
+
+
+def test_close_sends_pending_entries():
+    async def run():
+        dispatcher = LogDispatcher(asyncio.get_running_loop(), flush_interval=60)
+        channel = FakeChannel()
+        dispatcher.send(channel, "pending")
+        await asyncio.sleep(0)
+        await dispatcher.close(timeout=1)
+        return channel.sent
+    assert asyncio.run(run()) == [("pending", None)]
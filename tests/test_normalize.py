@@ -0,0 +1,39 @@
+from utils.normalize import NormalizedMessage, fold
+
+
+def test_fold_maps_confusables():
+    assert fold('Fr33shop') == 'freeshop'
+    assert fold('fr\u0435\u0435shop') == 'freeshop'  # cyrillic e
+    assert fold('ｆｒｅｅｓｈｏｐ') == 'freeshop'
+
+
+def test_fold_keeps_one_character_per_kept_character():
+    normalized = NormalizedMessage('a\u200bb\U0001f642c')
+    assert normalized.folded == 'abc'
+    assert normalized.offsets == [0, 2, 4]
+
+
+def test_find_returns_span_of_original_content():
+    content = 'get f*r*3*e shop now'
+    normalized = NormalizedMessage(content)
+    span = normalized.find('free')
+    assert span is not None
+    a, b = span
+    assert content[a:b] == 'f*r*3*e'
+
+
+def test_find_with_unicode_lookalikes():
+    content = 'try ｆｒｅｅｓｈｏｐ!'
+    a, b = NormalizedMessage(content).find('freeshop')
+    assert content[a:b] == 'ｆｒｅｅｓｈｏｐ'
+
+
+def test_find_missing_word():
+    assert NormalizedMessage('hello').find('freeshop') is None
+    assert NormalizedMessage('hello').find('') is None
+
+
+def test_text_no_separators_is_not_folded():
+    normalized = NormalizedMessage('see G*u*i*d*e.rackl4b or hack1nformer.com')
+    assert normalized.text_no_separators == 'seeguide.rackl4borhack1nformer.com'
+    assert normalized.no_separators == 'seeguide.racklaborhackinformer.com'
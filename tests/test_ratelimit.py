@@ -0,0 +1,31 @@
+from utils.ratelimit import MessageRecord, SlidingWindow
+
+
+def test_records_leave_the_window():
+    window = SlidingWindow(window=3, max_records=10)
+    window.add('a', MessageRecord(1, 1, 0.0))
+    window.add('a', MessageRecord(2, 1, 1.0))
+    records = window.add('a', MessageRecord(3, 1, 3.5))
+    assert [r.message_id for r in records] == [2, 3]
+
+
+def test_bucket_is_bounded():
+    window = SlidingWindow(window=60, max_records=3)
+    for i in range(10):
+        records = window.add('a', MessageRecord(i, 1, float(i)))
+    assert [r.message_id for r in records] == [7, 8, 9]
+
+
+def test_sweep_drops_empty_keys():
+    window = SlidingWindow(window=1, max_records=5)
+    window.add('a', MessageRecord(1, 1, 0.0))
+    window.add('b', MessageRecord(2, 1, 5.0))
+    window.sweep(5.5)
+    assert list(window.records) == ['b']
+
+
+def test_pop_removes_the_key():
+    window = SlidingWindow(window=10, max_records=5)
+    window.add('a', MessageRecord(1, 1, 0.0))
+    assert [r.message_id for r in window.pop('a')] == [1]
+    assert len(window) == 0
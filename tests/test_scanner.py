@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip('discord')
+
+from utils.normalize import NormalizedMessage  # noqa: E402
+from utils.scanner import ScanCache, ScanContext, ScanEngine, ScanRule, ScanVerdicts  # noqa: E402
+
+
+async def handler(ctx, result):
+    pass
+
+
+def verdicts(content, generation=0):
+    return ScanVerdicts(NormalizedMessage(content), {}, generation)
+
+
+def test_cache_discards_older_generations():
+    cache = ScanCache()
+    cache.put('hello', verdicts('hello', generation=1))
+    assert cache.get('hello', 1) is not None
+    assert cache.get('hello', 2) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_is_bounded_lru():
+    cache = ScanCache(max_size=2)
+    cache.put('a', verdicts('a'))
+    cache.put('b', verdicts('b'))
+    cache.get('a', 0)
+    cache.put('c', verdicts('c'))
+    assert list(cache.verdicts) == ['a', 'c']
+
+
+def test_engine_stats_count_cached_results_apart():
+    engine = ScanEngine()
+    rule = ScanRule('word', lambda ctx: 'bad' in ctx.normalized.text, handler, action='delete', terminal=True, cacheable=True)
+    engine.register(rule)
+    shared = verdicts('bad word')
+    for _ in range(3):
+        ctx = ScanContext(None, shared.normalized, None)
+        ctx.results = shared.results
+        before = (rule.runs, rule.cached, rule.hits)
+        fired = engine.evaluate(ctx)
+        # evaluation alone never touches the rules, so it can run in a worker thread
+        assert (rule.runs, rule.cached, rule.hits) == before
+        engine.record(ctx)
+        assert fired[0][0] is rule
+    assert (rule.runs, rule.cached, rule.hits) == (1, 2, 3)
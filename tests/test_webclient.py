@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from aiohttp import web  # noqa: E402
+from utils.webclient import WebClient  # noqa: E402
+
+
+def serve(handlers, test):
+    """Runs test(client, base_url) against a local server with the given handlers."""
+    async def run():
+        app = web.Application()
+        for path, handler in handlers.items():
+            app.router.add_get(path, handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        client = WebClient(backoff_base=0.01)
+        try:
+            return await test(client, f'http://127.0.0.1:{port}')
+        finally:
+            await client.close()
+            await runner.cleanup()
+    return asyncio.run(run())
+
+
+def test_conditional_request_reuses_cached_body():
+    calls = []
+
+    async def status(request):
+        calls.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        return web.json_response({'ok': True}, headers={'ETag': '"v1"'})
+
+    async def test(client, base):
+        first = await client.get(f'{base}/status', cache=True)
+        second = await client.get(f'{base}/status', cache=True)
+        return first, second
+    first, second = serve({'/status': status}, test)
+    assert calls == [None, '"v1"']
+    assert first.modified and not second.modified
+    assert second.json() == {'ok': True}
+
+
+def test_concurrent_requests_are_coalesced():
+    calls = []
+
+    async def slow(request):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return web.Response(text='done')
+
+    async def test(client, base):
+        return await asyncio.gather(*(client.get(f'{base}/slow') for _ in range(5)))
+    responses = serve({'/slow': slow}, test)
+    assert len(calls) == 1
+    assert all(r.text() == 'done' for r in responses)
+
+
+def test_server_errors_are_retried():
+    calls = []
+
+    async def flaky(request):
+        calls.append(1)
+        return web.Response(status=503) if len(calls) < 3 else web.Response(text='ok')
+
+    async def test(client, base):
+        return await client.get(f'{base}/flaky')
+    response = serve({'/flaky': flaky}, test)
+    assert response.status == 200
+    assert len(calls) == 3
+
+
+def test_last_error_status_is_returned_after_retries():
+    async def down(request):
+        return web.Response(status=503)
+
+    async def test(client, base):
+        return await client.get(f'{base}/down', retries=1)
+    assert serve({'/down': down}, test).status == 503
@@ -0,0 +1,119 @@
+import aiohttp
+import asyncio
+import discord
+import hashlib
+
+from collections import OrderedDict, deque
+from time import monotonic
+from typing import Deque, List, Optional, Tuple
+from typing import OrderedDict as OrderedDictType
+from utils.webclient import WebClient
+
+
+class AttachmentUpload:
+    __slots__ = ('user_id', 'channel_id', 'jump_url', 'timestamp')
+
+    def __init__(self, user_id: int, channel_id: int, jump_url: str, timestamp: float):
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.jump_url = jump_url
+        self.timestamp = timestamp
+
+
+class AttachmentEntry:
+    """A file seen recently, with its latest uploads and the reposts that weren't logged yet."""
+    def __init__(self, filename: str, size: int, url: str, history: int):
+        self.filename = filename
+        self.size = size
+        self.url = url
+        self.digest: Optional[bytes] = None
+        self.count = 0
+        self.first_seen = monotonic()
+        self.last_seen = self.first_seen
+        self.uploads: Deque[AttachmentUpload] = deque(maxlen=history)
+        self.reposts: List[AttachmentUpload] = []
+        self.flush_task: Optional[asyncio.Task] = None
+
+
+class AttachmentTracker:
+    """
+    Recognizes files uploaded again within `ttl` seconds.
+
+    Files are matched by size and filename first, the first `hash_bytes` bytes are only downloaded and hashed
+    when another file with the same size and name was seen, to tell apart different files that share them.
+    """
+    def __init__(self, client: WebClient, ttl: float = 900.0, max_size: int = 2048, hash_bytes: int = 65536, history: int = 25):
+        self.client = client
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hash_bytes = hash_bytes
+        self.history = history
+        # (size, lowered filename) -> files with that size and name
+        self.entries: OrderedDictType[Tuple[int, str], List[AttachmentEntry]] = OrderedDict()
+
+    def expire(self, now: float):
+        limit = now - self.ttl
+        while self.entries:
+            key, files = next(iter(self.entries.items()))
+            if len(self.entries) <= self.max_size and max(f.last_seen for f in files) > limit:
+                break
+            del self.entries[key]
+
+    async def digest(self, url: str) -> Optional[bytes]:
+        """Hashes the first bytes of a file, returns None if it couldn't be downloaded."""
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            async with self.client.session.get(url, headers={'Range': f'bytes=0-{self.hash_bytes - 1}'},
+                                        timeout=aiohttp.ClientTimeout(total=10)) as r:
+                r.raise_for_status()
+                read = 0
+                async for chunk in r.content.iter_chunked(8192):
+                    digest.update(chunk[:self.hash_bytes - read])
+                    read += len(chunk)
+                    if read >= self.hash_bytes:
+                        break
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+        return digest.digest()
+
+    async def track(self, attachment: discord.Attachment, message: discord.Message) -> Tuple[AttachmentEntry, bool]:
+        """Records an upload and returns the entry of the file and whether it was seen before."""
+        now = monotonic()
+        self.expire(now)
+        key = (attachment.size, attachment.filename.lower())
+        files = self.entries.setdefault(key, [])
+        self.entries.move_to_end(key)
+        entry = None
+        if files:
+            digest = await self.digest(attachment.url)
+            for candidate in files:
+                if candidate.digest is None:
+                    candidate.digest = await self.digest(candidate.url)
+                # files that can't be downloaded anymore are assumed to be the same
+                if digest is None or candidate.digest is None or candidate.digest == digest:
+                    entry = candidate
+                    break
+        seen = entry is not None
+        if entry is None:
+            entry = AttachmentEntry(attachment.filename, attachment.size, attachment.url, self.history)
+            entry.digest = digest if files else None
+            files.append(entry)
+        upload = AttachmentUpload(message.author.id, message.channel.id, message.jump_url, now)
+        entry.count += 1
+        entry.last_seen = now
+        entry.uploads.append(upload)
+        if seen:
+            entry.reposts.append(upload)
+        return entry, seen
+
+    def lookup(self, filename: str) -> List[AttachmentEntry]:
+        """Returns the tracked files with the filename, most recently seen first."""
+        filename = filename.lower()
+        found = [entry for (_, name), files in self.entries.items() if name == filename for entry in files]
+        return sorted(found, key=lambda entry: entry.last_seen, reverse=True)
+
+    def close(self):
+        for files in self.entries.values():
+            for entry in files:
+                if entry.flush_task:
+                    entry.flush_task.cancel()
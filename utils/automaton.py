@@ -0,0 +1,60 @@
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class WordAutomaton:
+    """
+    Aho-Corasick automaton matching every filtered word in a single pass over the text.
+
+    An automaton is never modified after it's built. A changed filter builds a new one that replaces the old
+    one in a single assignment, so searches running in other threads always see a complete automaton,
+    and the node arrays never keep the slots of removed words.
+    Each word maps to a value kept in `words`, so what the found words stand for is read from the same snapshot.
+    """
+
+    def __init__(self, words: Dict[str, Any] = None):
+        self.words: Dict[str, Any] = dict(words or {})
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Tuple[str, ...]] = [()]
+        terminal: List[Optional[str]] = [None]
+        for word in self.words:
+            node = 0
+            for char in word:
+                if (nxt := self.goto[node].get(char)) is None:
+                    nxt = len(self.goto)
+                    self.goto[node][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                    terminal.append(None)
+                node = nxt
+            terminal[node] = word
+        # failure links and output sets, breadth first so the failure target of a node is always done first
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            own = (terminal[node],) if terminal[node] else ()
+            self.output[node] = own + self.output[self.fail[node]]
+            for char, nxt in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[nxt] = self.goto[fail].get(char, 0)
+                queue.append(nxt)
+
+    def search(self, text: str) -> Set[str]:
+        """Returns the set of words found in text."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+    def __len__(self):
+        return len(self.words)
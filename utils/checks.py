@@ -1,11 +1,47 @@
+import asyncio
 import discord
 
 from discord.ext import commands
-from utils.crud import get_helper, get_staff
+from typing import Dict, Optional, Tuple
+from utils import crud
 
 staff_ranks = {"Owner": 0, "SuperOP": 1, "OP": 2, "HalfOP": 3, "Helper": 4}
 
 
+class StaffRoster:
+    """Cache of the staff table mapping user ids to their position and console.
+
+    The crud functions that modify staff invalidate it and it is reloaded on the next lookup."""
+    def __init__(self):
+        self.members: Dict[int, Tuple[str, Optional[str]]] = {}
+        self.loaded = False
+        self.generation = 0
+        self.lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.loaded = False
+        self.generation += 1
+
+    async def refresh(self):
+        async with self.lock:
+            # another waiter may have reloaded it while this one waited for the lock
+            if self.loaded:
+                return
+            generation = self.generation
+            self.members = {staff.id: (staff.position, staff.console) for staff in await crud.get_staff_roster()}
+            # an invalidation during the query means the result could be stale
+            self.loaded = generation == self.generation
+
+    async def get(self, user_id: int) -> Optional[Tuple[str, Optional[str]]]:
+        if not self.loaded:
+            await self.refresh()
+        return self.members.get(user_id)
+
+
+staff_roster = StaffRoster()
+crud.staff_change_hooks.append(staff_roster.invalidate)
+
+
 def is_staff(role):
     async def predicate(ctx):
         if isinstance(ctx.channel, discord.abc.GuildChannel):
@@ -21,11 +57,13 @@ async def check_staff(ctx, role: str):
 
 
 async def check_staff_id(role: str, user_id: int):
+    if not (entry := await staff_roster.get(user_id)):
+        return False
+    position, _ = entry
     if role == "Helper":
-        if await get_helper(user_id):
-            return True
-    if staff := await get_staff(user_id):
-        return staff_ranks[staff.position] <= staff_ranks[role]
+        return True
+    if position != "Helper":
+        return staff_ranks[position] <= staff_ranks[role]
     return False
 
 
@@ -1,9 +1,18 @@
 import datetime
 
-from . import models
+from . import expiry, models
 from discord import utils, TextChannel
 
 
+# called after the staff table changes, the permission checks register the invalidation of their cache here
+staff_change_hooks = []
+
+
+def staff_changed():
+    for hook in staff_change_hooks:
+        hook()
+
+
 def generate_id():
     return utils.time_snowflake(datetime.datetime.now())
 
@@ -36,6 +45,7 @@ async def add_staff(user_id: int, position: str):
         await staff.update(position=position).apply()
     else:
         await models.Staff.create(id=user_id, position=position)
+    staff_changed()
 
 
 async def add_helper(user_id: int, position: str, console: str = None):
@@ -44,6 +54,7 @@ async def add_helper(user_id: int, position: str, console: str = None):
         await staff.update(console=console).apply()
     else:
         await models.Staff.create(id=user_id, position=position, console=console)
+    staff_changed()
 
 
 async def remove_staff(user_id: int):
@@ -53,6 +64,7 @@ async def remove_staff(user_id: int):
             await staff.update(position="Helper").apply()
         else:
             await staff.delete()
+    staff_changed()
 
 
 async def remove_helper(user_id: int):
@@ -62,6 +74,7 @@ async def remove_helper(user_id: int):
             await helper.update(console=None).apply()
         else:
             await helper.delete()
+    staff_changed()
 
 
 async def get_staff_all():
@@ -81,6 +94,10 @@ async def get_helper(user_id: int):
     return await models.Staff.query.where(models.Staff.id == user_id).gino.first()
 
 
+async def get_staff_roster():
+    return await models.Staff.query.gino.all()
+
+
 async def add_warn(user_id: int, issuer_id: int, reason: str):
     await add_dbmember_if_not_exist(user_id)
     await add_dbmember_if_not_exist(issuer_id)
@@ -120,6 +137,7 @@ async def add_timed_restriction(user_id: int, end_date: datetime.datetime, type:
     await add_dbmember_if_not_exist(user_id)
     await models.TimedRestriction.create(id=generate_id(), user=user_id, type=type,
                                          end_date=end_date)
+    expiry.scheduler.add_restriction(user_id, type, end_date)
 
 
 async def get_time_restrictions_by_user(user_id: int):
@@ -131,25 +149,44 @@ async def get_time_restrictions_by_user_type(user_id: int, type: str):
             models.TimedRestriction.type == type)).gino.first()
 
 
-async def get_time_restrictions_by_type(type: str):
-    return await models.TimedRestriction.query.where(models.TimedRestriction.type == type).gino.all()
+async def get_time_restrictions():
+    return await models.TimedRestriction.query.gino.all()
 
 
 async def remove_timed_restriction(user_id: int, type: str):
     time_restriction = await get_time_restrictions_by_user_type(user_id, type)
     if time_restriction:
         await time_restriction.delete()
+    expiry.scheduler.remove_restriction(user_id, type)
 
 
 async def set_time_restriction_alert(user_id: int, type: str):
     time_restriction = await get_time_restrictions_by_user_type(user_id, type)
     if time_restriction:
         await time_restriction.update(alerted=True).apply()
+    expiry.scheduler.cancel(('alert', type, user_id))
+
+
+async def expire_timed_restrictions(now: datetime.datetime, role_ids: dict):
+    """Deletes every restriction that ended by now, and the permanent roles they gave, in a single transaction.
+
+    role_ids maps restriction types to the id of their role. Returns the deleted (user, type) rows."""
+    async with models.db.transaction():
+        expired = await models.TimedRestriction.delete.where(models.TimedRestriction.end_date <= now).returning(
+            models.TimedRestriction.user, models.TimedRestriction.type).gino.all()
+        roles = list({(row.user, role_ids[row.type]) for row in expired if row.type in role_ids})
+        if roles:
+            await models.PermanentRole.delete.where(models.db.tuple_(
+                models.PermanentRole.user_id, models.PermanentRole.role_id).in_(roles)).gino.status()
+    for row in expired:
+        expiry.scheduler.remove_restriction(row.user, row.type)
+    return expired
 
 
 async def add_timed_role(user_id: int, role_id: int, expiring_date: datetime.datetime):
     await add_dbmember_if_not_exist(user_id)
     entry = await get_time_role_by_user_type(user_id, role_id)
+    expiry.scheduler.add_timed_role(user_id, role_id, expiring_date)
     if not entry:
         return await models.TimedRole.create(id=generate_id(), user_id=user_id, role_id=role_id, expiring_date=expiring_date)
     await entry.update(expiring_date=expiring_date).apply()
@@ -160,6 +197,7 @@ async def remove_timed_role(user_id: int, role_id: int):
     timed_role = await get_time_role_by_user_type(user_id, role_id)
     if timed_role:
         await timed_role.delete()
+    expiry.scheduler.remove_timed_role(user_id, role_id)
 
 
 async def get_time_role_by_user_type(user_id: int, role_id: int):
@@ -227,6 +265,10 @@ async def get_dbchannel(channel_id: int):
     return await models.Channel.get(channel_id)
 
 
+async def get_dbchannels():
+    return await models.Channel.query.gino.all()
+
+
 async def add_dbrole(role_id: int, name: str):
     return await models.Role.create(id=role_id, name=name)
 
@@ -239,6 +281,31 @@ async def get_softban(user_id: int):
     return await models.Softban.query.where(models.Softban.user == user_id).gino.first()
 
 
+async def get_join_state(user_id: int):
+    """Returns the softban, permanent role ids and warns of a user, fetched in a single query."""
+    db = models.db
+    query = db.union_all(
+        db.select([db.literal('softban').label('kind'), models.Softban.id, models.Softban.issuer, models.Softban.reason]).where(
+            models.Softban.user == user_id),
+        db.select([db.literal('role'), models.PermanentRole.role_id, db.null().label('issuer'), db.null().label('reason')]).where(
+            models.PermanentRole.user_id == user_id),
+        db.select([db.literal('warn'), models.Warn.id, models.Warn.issuer, models.Warn.reason]).where(
+            models.Warn.user == user_id),
+    )
+    softban = None
+    role_ids = []
+    warns = []
+    for row in await db.all(query):
+        if row.kind == 'softban':
+            softban = row
+        elif row.kind == 'role':
+            role_ids.append(row.id)
+        else:
+            warns.append(row)
+    warns.sort(key=lambda warn: warn.id)
+    return softban, role_ids, warns
+
+
 async def add_watch(user_id: int):
     db_member = await add_dbmember_if_not_exist(user_id)
     await db_member.update(watched=True).apply()
@@ -250,9 +317,8 @@ async def remove_watch(user_id: int):
         await db_member.update(watched=False).apply()
 
 
-async def is_watched(user_id: int):
-    db_member = await get_dbmember(user_id)
-    return db_member.watched if db_member else False
+async def get_watched():
+    return await models.Member.query.where(models.Member.watched.is_(True)).gino.all()
 
 
 async def add_nofilter(channel: TextChannel):
@@ -260,17 +326,14 @@ async def add_nofilter(channel: TextChannel):
     if not db_channel:
         db_channel = await add_dbchannel(channel.id, channel.name)
     await db_channel.update(nofilter=True).apply()
+    return db_channel
 
 
 async def remove_nofilter(channel: TextChannel):
     db_channel = await get_dbchannel(channel.id)
     if db_channel:
-        await db_channel.update(nofilter=True).apply()
-
-
-async def check_nofilter(channel: TextChannel):
-    channel = await models.Channel.get(channel.id)
-    return channel.nofilter if channel else False
+        await db_channel.update(nofilter=False).apply()
+    return db_channel
 
 
 async def add_friendcode(user_id: int, fc: int):
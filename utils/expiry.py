@@ -0,0 +1,127 @@
+import asyncio
+import heapq
+import itertools
+
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class RestrictionType:
+    """
+    How a kind of timed restriction is lifted and announced.
+
+    Restrictions with a `role` have it removed when they expire, the others are timebans and lift a ban.
+    Staff is alerted in `alert_channel` `warning_period` before the restriction expires.
+    """
+    def __init__(self, type: str, role: Optional[str], warning_period: timedelta, log_channels: Tuple[str, ...],
+                 alert_channel: str, expired_message: str, alert_message: str):
+        self.type = type
+        self.role = role
+        self.warning_period = warning_period
+        self.log_channels = log_channels
+        self.alert_channel = alert_channel
+        self.expired_message = expired_message
+        self.alert_message = alert_message
+
+    @property
+    def unban(self) -> bool:
+        return self.role is None
+
+
+restriction_types = {restriction.type: restriction for restriction in (
+    RestrictionType('timeban', None, timedelta(minutes=30), ('mod-logs',), 'mods',
+                    "⚠️ **Ban expired**: <@{user_id}> | {name}",
+                    "**Note**: {user_id} will be unbanned in {minutes} minutes."),
+    RestrictionType('timemute', 'Muted', timedelta(minutes=10), ('mod-logs',), 'mods',
+                    "🔈 **Mute expired**: <@{user_id}>",
+                    "**Note**: <@{user_id}> will be unmuted in {minutes} minutes."),
+    RestrictionType('timenohelp', 'No-Help', timedelta(minutes=10), ('mod-logs', 'helpers'), 'helpers',
+                    "⭕️ **No-Help Restriction expired**: <@{user_id}>",
+                    "**Note**: <@{user_id}> no-help restriction will expire in {minutes} minutes."),
+    RestrictionType('timehelpmute', 'help-mute', timedelta(minutes=10), ('mod-logs', 'helpers'), 'helpers',
+                    "⭕️ **Help Mute expired**: <@{user_id}>",
+                    "**Note**: <@{user_id}> help mute will expire in {minutes} minutes."),
+    RestrictionType('timenotech', 'No-Tech', timedelta(minutes=10), ('mod-logs', 'helpers'), 'helpers',
+                    "⭕️ **No-Tech Restriction expired**: <@{user_id}>",
+                    "**Note**: <@{user_id}> no-tech restriction will expire in {minutes} minutes."),
+)}
+
+
+class ExpiryScheduler:
+    """
+    Min-heap of the upcoming deadlines of timed restrictions, their alerts and timed roles.
+
+    Keys are ('expire' | 'alert', restriction type, user id) and ('role', role id, user id).
+    Rescheduled or cancelled keys leave stale items in the heap that are skipped when popped,
+    so every change is O(log n).
+    """
+    def __init__(self):
+        self.heap: List[Tuple[datetime, int, Hashable]] = []
+        self.deadlines: Dict[Hashable, datetime] = {}
+        self.counter = itertools.count()
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def schedule(self, key: Hashable, when: datetime):
+        self.deadlines[key] = when
+        heapq.heappush(self.heap, (when, next(self.counter), key))
+        if len(self.heap) > 2 * len(self.deadlines) + 64:
+            self.compact()
+        if self.wakeup and self.heap[0][2] == key:
+            self.wakeup.set()
+
+    def cancel(self, key: Hashable):
+        self.deadlines.pop(key, None)
+
+    def compact(self):
+        self.heap = [item for item in self.heap if self.deadlines.get(item[2]) == item[0]]
+        heapq.heapify(self.heap)
+
+    def clear(self):
+        self.heap.clear()
+        self.deadlines.clear()
+
+    def next_deadline(self) -> Optional[datetime]:
+        while self.heap and self.deadlines.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: datetime) -> List[Hashable]:
+        due = []
+        while (deadline := self.next_deadline()) is not None and deadline <= now:
+            _, _, key = heapq.heappop(self.heap)
+            del self.deadlines[key]
+            due.append(key)
+        return due
+
+    async def wait(self) -> List[Hashable]:
+        """Sleeps until the next deadline and returns every key that is due."""
+        if self.wakeup is None:
+            self.wakeup = asyncio.Event()
+        while True:
+            self.wakeup.clear()
+            if due := self.pop_due(datetime.now()):
+                return due
+            deadline = self.next_deadline()
+            timeout = (deadline - datetime.now()).total_seconds() if deadline else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def add_restriction(self, user_id: int, type: str, end_date: datetime, alerted: bool = False):
+        self.schedule(('expire', type, user_id), end_date)
+        if not alerted and type in restriction_types:
+            self.schedule(('alert', type, user_id), end_date - restriction_types[type].warning_period)
+
+    def remove_restriction(self, user_id: int, type: str):
+        self.cancel(('expire', type, user_id))
+        self.cancel(('alert', type, user_id))
+
+    def add_timed_role(self, user_id: int, role_id: int, expiring_date: datetime):
+        self.schedule(('role', role_id, user_id), expiring_date)
+
+    def remove_timed_role(self, user_id: int, role_id: int):
+        self.cancel(('role', role_id, user_id))
+
+
+scheduler = ExpiryScheduler()
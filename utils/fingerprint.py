@@ -0,0 +1,103 @@
+import heapq
+
+from collections import deque
+from time import monotonic
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+def sketch(text: str, k: int = 16, shingle_size: int = 4) -> Tuple[int, ...]:
+    """Bottom-k MinHash sketch of the character shingles of text, the k smallest shingle hashes."""
+    shingles = {text[i:i + shingle_size] for i in range(max(len(text) - shingle_size + 1, 1))}
+    return tuple(heapq.nsmallest(k, map(hash, shingles)))
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimates the Jaccard similarity of the shingles of two texts from their sketches."""
+    union = heapq.nsmallest(max(len(a), len(b)), set(a).union(b))
+    both = set(a).intersection(b)
+    return sum(1 for x in union if x in both) / len(union) if union else 0.0
+
+
+class Flood:
+    """A group of near-identical messages that reached the threshold. Staff is only alerted once per flood."""
+    __slots__ = ('size', 'alerted')
+
+    def __init__(self, size: int):
+        self.size = size
+        self.alerted = False
+
+
+class FingerprintRecord:
+    __slots__ = ('message_id', 'channel_id', 'author_id', 'timestamp', 'sketch', 'flood')
+
+    def __init__(self, message_id: int, channel_id: int, author_id: int, timestamp: float, sketch: Tuple[int, ...]):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.timestamp = timestamp
+        self.sketch = sketch
+        self.flood: Optional[Flood] = None
+
+
+class FingerprintIndex:
+    """
+    Sketches of the messages seen in the last `window` seconds, used to find near-identical messages
+    posted by any user in any channel.
+
+    Records are bucketed by each hash of their sketch, so a lookup only compares against the messages
+    sharing a shingle with the new one instead of every recent message.
+    """
+    def __init__(self, window: float, threshold: int, min_similarity: float = 0.5):
+        self.window = window
+        self.threshold = threshold
+        self.min_similarity = min_similarity
+        self.records: Deque[FingerprintRecord] = deque()
+        # shingle hash -> message id -> record
+        self.buckets: Dict[int, Dict[int, FingerprintRecord]] = {}
+
+    def expire(self, now: float):
+        limit = now - self.window
+        while self.records and self.records[0].timestamp <= limit:
+            record = self.records.popleft()
+            for h in record.sketch:
+                bucket = self.buckets[h]
+                bucket.pop(record.message_id, None)
+                if not bucket:
+                    del self.buckets[h]
+
+    def sweep(self, now: float = None):
+        self.expire(monotonic() if now is None else now)
+
+    def add(self, record: FingerprintRecord) -> List[FingerprintRecord]:
+        """
+        Adds a record and returns the records that just became part of a flood of near-identical messages.
+
+        The first time `threshold` similar messages are seen all of them are returned, after that
+        each new similar message is returned on its own until the flood leaves the window.
+        The returned records share the same `flood`.
+        """
+        self.expire(record.timestamp)
+        candidates = {}
+        for h in record.sketch:
+            if bucket := self.buckets.get(h):
+                candidates.update(bucket)
+        near = [c for c in candidates.values() if similarity(c.sketch, record.sketch) >= self.min_similarity]
+
+        self.records.append(record)
+        for h in record.sketch:
+            self.buckets.setdefault(h, {})[record.message_id] = record
+
+        if flood := next((c.flood for c in near if c.flood), None):
+            flood.size += 1
+            record.flood = flood
+            return [record]
+        if len(near) + 1 >= self.threshold:
+            flood = Flood(len(near) + 1)
+            for c in near:
+                c.flood = flood
+            record.flood = flood
+            return sorted(near, key=lambda c: c.timestamp) + [record]
+        return []
+
+    def __len__(self):
+        return len(self.records)
@@ -0,0 +1,72 @@
+import asyncio
+import discord
+
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict, Optional, Tuple
+from typing import OrderedDict as OrderedDictType
+
+
+class InviteResolver:
+    """
+    LRU cache with expiry of the guild each invite code points to.
+
+    Lookups never touch the API, unknown codes are resolved with `resolve`, which shares
+    a single request between every caller waiting on the same code.
+    Codes of invalid or expired invites are cached as None for `negative_ttl` seconds.
+    """
+    def __init__(self, bot: discord.Client, ttl: float = 3600.0, negative_ttl: float = 300.0, max_size: int = 2048):
+        self.bot = bot
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        # code -> (guild id, expiry)
+        self.cache: OrderedDictType[str, Tuple[Optional[int], float]] = OrderedDict()
+        self.inflight: Dict[str, asyncio.Task] = {}
+
+    def lookup(self, code: str) -> Tuple[bool, Optional[int]]:
+        """Returns if the code is cached and the id of its guild, None for invalid invites."""
+        entry = self.cache.get(code)
+        if entry is None:
+            return False, None
+        if entry[1] <= monotonic():
+            del self.cache[code]
+            return False, None
+        self.cache.move_to_end(code)
+        return True, entry[0]
+
+    def peek(self, code: str) -> Tuple[bool, Optional[int]]:
+        """Like lookup, but never changes the cache, so it can be called from the scan worker threads."""
+        entry = self.cache.get(code)
+        if entry is None or entry[1] <= monotonic():
+            return False, None
+        return True, entry[0]
+
+    def put(self, code: str, guild_id: Optional[int]):
+        ttl = self.ttl if guild_id else self.negative_ttl
+        self.cache[code] = (guild_id, monotonic() + ttl)
+        self.cache.move_to_end(code)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+    async def resolve(self, code: str) -> Optional[int]:
+        """Returns the id of the guild the invite points to, None if the invite is invalid.
+
+        Errors talking with the API are raised and not cached."""
+        found, guild_id = self.lookup(code)
+        if found:
+            return guild_id
+        if (task := self.inflight.get(code)) is None:
+            task = self.inflight[code] = asyncio.create_task(self.fetch(code))
+            task.add_done_callback(lambda _: self.inflight.pop(code, None))
+        return await asyncio.shield(task)
+
+    async def fetch(self, code: str) -> Optional[int]:
+        try:
+            invite = await self.bot.fetch_invite(code, with_counts=False)
+        except discord.NotFound:
+            guild_id = None
+        else:
+            guild_id = invite.guild.id if invite.guild else None
+        self.put(code, guild_id)
+        return guild_id
@@ -0,0 +1,132 @@
+import asyncio
+import sys
+import traceback
+
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Awaitable, Callable, Collection, Dict, Optional
+
+
+class Job:
+    """
+    A coroutine run every `interval` seconds, or at the wall clock `minutes` of the `hours` like a cron entry.
+
+    A run that starts more than `grace` seconds late is skipped when `skip_missed` is set, otherwise missed runs
+    are collapsed into a single late run. A run never starts while the previous one is still going.
+    """
+    def __init__(self, name: str, func: Callable[[], Awaitable], *, interval: float = None,
+                 minutes: Collection[int] = None, hours: Collection[int] = None,
+                 grace: float = 60.0, skip_missed: bool = False, run_at_start: bool = False):
+        if (interval is None) == (minutes is None):
+            raise ValueError("A job needs either an interval or the minutes it runs at")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.minutes = frozenset(minutes) if minutes is not None else None
+        self.hours = frozenset(hours) if hours is not None else None
+        self.grace = grace
+        self.skip_missed = skip_missed
+        self.run_at_start = run_at_start
+        # wall clock time of the next cron run
+        self.scheduled: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+        self.running: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_run: Optional[datetime] = None
+        self.last_duration = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def next_time(self, after: datetime) -> datetime:
+        """The first wall clock time matching the cron fields strictly after `after`."""
+        candidate = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # a day always has a matching minute if hours and minutes aren't empty
+        for _ in range(24 * 60):
+            if candidate.minute in self.minutes and (self.hours is None or candidate.hour in self.hours):
+                return candidate
+            candidate += timedelta(minutes=1)
+        raise ValueError(f"Job {self.name} never runs")
+
+    def first_deadline(self, now: float) -> float:
+        if self.run_at_start:
+            return now
+        return self.next_deadline(now, now)
+
+    def next_deadline(self, deadline: float, now: float) -> float:
+        """The monotonic time of the next run after the one due at `deadline`, skipping the runs already missed.
+
+        Interval deadlines are counted from the previous deadline instead of from when the run ended,
+        so the time taken by the runs doesn't add up."""
+        if self.interval is not None:
+            missed = max(0, int((now - deadline) // self.interval))
+            return deadline + (missed + 1) * self.interval
+        wall_now = datetime.now()
+        # the monotonic and wall clocks can disagree slightly, never schedule the same minute twice
+        self.scheduled = self.next_time(max(wall_now, self.scheduled) if self.scheduled else wall_now)
+        return now + (self.scheduled - wall_now).total_seconds()
+
+
+class JobScheduler:
+    """Runs every registered job from its own task, keeping the run metrics of each."""
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.jobs: Dict[str, Job] = {}
+
+    def add(self, job: Job) -> Job:
+        if job.name in self.jobs:
+            self.remove(job.name)
+        self.jobs[job.name] = job
+        job.task = self.loop.create_task(self.run(job))
+        return job
+
+    def every(self, name: str, seconds: float, func: Callable[[], Awaitable], **kwargs) -> Job:
+        return self.add(Job(name, func, interval=seconds, **kwargs))
+
+    def cron(self, name: str, func: Callable[[], Awaitable], *, minutes: Collection[int],
+             hours: Collection[int] = None, **kwargs) -> Job:
+        return self.add(Job(name, func, minutes=minutes, hours=hours, **kwargs))
+
+    def remove(self, name: str):
+        if job := self.jobs.pop(name, None):
+            for task in (job.task, job.running):
+                if task:
+                    task.cancel()
+
+    async def run(self, job: Job):
+        deadline = job.first_deadline(monotonic())
+        while True:
+            # sleeping can end early or late, the lag is measured against the deadline
+            while (delay := deadline - monotonic()) > 0:
+                await asyncio.sleep(delay)
+            now = monotonic()
+            lag = now - deadline
+            if job.running and not job.running.done():
+                job.skipped += 1
+            elif lag > job.grace and job.skip_missed:
+                job.skipped += 1
+            else:
+                job.last_lag = lag
+                job.max_lag = max(job.max_lag, lag)
+                job.running = self.loop.create_task(self.execute(job))
+            deadline = job.next_deadline(deadline, now)
+
+    @staticmethod
+    async def execute(job: Job):
+        start = monotonic()
+        job.last_run = datetime.now()
+        try:
+            await job.func()
+        except Exception as e:
+            job.failures += 1
+            print(f'Ignoring exception in job {job.name}', file=sys.stderr)
+            traceback.print_tb(e.__traceback__)
+            print(f'{e.__class__.__name__}: {e}', file=sys.stderr)
+        finally:
+            job.runs += 1
+            job.last_duration = monotonic() - start
+
+    def close(self):
+        for name in list(self.jobs):
+            self.remove(name)
@@ -0,0 +1,28 @@
+import discord
+
+from typing import Callable, Dict, Iterable, Set
+
+RoleProvider = Callable[[discord.Member, bool], Iterable[discord.Role]]
+
+
+class JoinPipeline:
+    """
+    Roles given to members when they join, collected from the cogs so they can be applied with a single member edit.
+
+    Cogs register a provider that receives the member and whether the server is in raid mode,
+    the pipeline itself is run by the Logs cog.
+    """
+    def __init__(self):
+        self.providers: Dict[str, RoleProvider] = {}
+
+    def register(self, name: str, provider: RoleProvider):
+        self.providers[name] = provider
+
+    def unregister(self, name: str):
+        self.providers.pop(name, None)
+
+    def roles_for(self, member: discord.Member, raid: bool) -> Set[discord.Role]:
+        roles = set()
+        for provider in self.providers.values():
+            roles.update(provider(member, raid))
+        return roles
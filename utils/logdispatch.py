@@ -0,0 +1,153 @@
+import asyncio
+import discord
+import sys
+import traceback
+
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+
+class LogEntry:
+    __slots__ = ('content', 'embed', 'allowed_mentions')
+
+    def __init__(self, content: Optional[str], embed: Optional[discord.Embed], allowed_mentions: Optional[discord.AllowedMentions]):
+        self.content = content
+        self.embed = embed
+        self.allowed_mentions = allowed_mentions
+
+
+class ChannelQueue:
+    def __init__(self):
+        # urgent entries are sent before normal ones
+        self.lanes: Tuple[Deque[LogEntry], Deque[LogEntry]] = (deque(), deque())
+        self.event = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def __bool__(self):
+        return bool(self.lanes[0] or self.lanes[1])
+
+
+class LogDispatcher:
+    """
+    Sends log messages from a background task per channel so logging never waits on Discord rate limits.
+
+    Normal entries are held for `flush_interval` seconds so bursts can be merged, runs of plain text entries are
+    joined into a single message and runs of small embeds are packed as the fields of a single embed.
+    Embeds that don't fit in a field unchanged are always sent as they are.
+    Urgent entries, like mod alerts, are sent first and never wait for a burst.
+    """
+    max_content = 2000
+    # limits of an embed packing several entries
+    max_fields = 25
+    max_field_name = 256
+    max_field_value = 1024
+    max_embed_size = 5500
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, flush_interval: float = 1.0, max_batch: int = 10):
+        self.loop = loop
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.queues: Dict[int, ChannelQueue] = {}
+        self.closed = asyncio.Event()
+
+    def send(self, channel: discord.abc.Messageable, content: str = None, *, embed: discord.Embed = None,
+             allowed_mentions: discord.AllowedMentions = None, urgent: bool = False):
+        """Queues a message for the channel. The embed is copied so the caller can keep modifying it."""
+        if channel is None:
+            return
+        if (queue := self.queues.get(channel.id)) is None:
+            queue = self.queues[channel.id] = ChannelQueue()
+        if queue.task is None or queue.task.done():
+            queue.task = self.loop.create_task(self.worker(channel, queue))
+        queue.lanes[0 if urgent else 1].append(LogEntry(content, embed.copy() if embed else None, allowed_mentions))
+        queue.event.set()
+
+    def pack_field(self, entry: LogEntry) -> Optional[Tuple[str, str]]:
+        """Turns an entry with an embed into the name and value of a field of a packed embed.
+
+        Returns None when the embed can't be packed without losing or cutting part of it,
+        it's then sent on its own."""
+        embed = entry.embed
+        if embed.fields or embed.image.url or embed.thumbnail.url or embed.footer.text or (embed.title and embed.author.name):
+            return None
+        name = str(embed.title or embed.author.name or '\u200b')
+        value = '\n'.join(str(part) for part in (entry.content, embed.description) if part) or '\u200b'
+        if len(name) > self.max_field_name or len(value) > self.max_field_value:
+            return None
+        return name, value
+
+    def next_message(self, queue: ChannelQueue) -> LogEntry:
+        """Pops the next entries of the queue that can be sent together and merges them, keeping their order.
+
+        Consecutive plain text entries are joined into the content. Consecutive entries with small
+        embeds become the fields of a single packed embed, within Discord's embed limits."""
+        lane = queue.lanes[0] if queue.lanes[0] else queue.lanes[1]
+        entry = lane.popleft()
+        if entry.allowed_mentions:
+            return entry
+        if entry.embed:
+            if (field := self.pack_field(entry)) is None:
+                return entry
+            packed = [entry]
+            fields = [field]
+            embed_size = len(field[0]) + len(field[1])
+            while lane and len(packed) < min(self.max_batch, self.max_fields):
+                nxt = lane[0]
+                if nxt.allowed_mentions or not nxt.embed:
+                    break
+                if (field := self.pack_field(nxt)) is None or embed_size + len(field[0]) + len(field[1]) > self.max_embed_size:
+                    break
+                packed.append(nxt)
+                fields.append(field)
+                embed_size += len(field[0]) + len(field[1])
+                lane.popleft()
+            if len(packed) == 1:
+                return entry
+            embed = discord.Embed(title=f"{len(packed)} log entries", color=entry.embed.color)
+            for name, value in fields:
+                embed.add_field(name=name, value=value, inline=False)
+            return LogEntry(None, embed, None)
+        lines = [entry.content or '']
+        content_size = len(lines[0])
+        while lane and len(lines) < self.max_batch:
+            nxt = lane[0]
+            if nxt.allowed_mentions or nxt.embed or content_size + len(nxt.content or '') + 1 > self.max_content:
+                break
+            lines.append(nxt.content or '')
+            content_size += len(nxt.content or '') + 1
+            lane.popleft()
+        return LogEntry('\n'.join(line for line in lines if line) or None, None, None)
+
+    async def worker(self, channel: discord.abc.Messageable, queue: ChannelQueue):
+        while True:
+            await queue.event.wait()
+            queue.event.clear()
+            if not self.closed.is_set() and not queue.lanes[0] and len(queue.lanes[1]) < self.max_batch:
+                # give the burst some time to accumulate, unless the dispatcher closes meanwhile
+                try:
+                    await asyncio.wait_for(self.closed.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            while queue:
+                entry = self.next_message(queue)
+                try:
+                    await channel.send(entry.content, embed=entry.embed, allowed_mentions=entry.allowed_mentions)
+                except Exception as e:
+                    print(f'Ignoring exception while sending logs to {channel}', file=sys.stderr)
+                    traceback.print_tb(e.__traceback__)
+                    print(f'{e.__class__.__name__}: {e}', file=sys.stderr)
+            if self.closed.is_set():
+                return
+
+    async def close(self, timeout: float = 5.0):
+        """Sends what is still queued, then cancels the workers that didn't finish within timeout."""
+        self.closed.set()
+        tasks = []
+        for queue in self.queues.values():
+            if queue.task and not queue.task.done():
+                queue.event.set()
+                tasks.append(queue.task)
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        for task in tasks:
+            task.cancel()
@@ -1,28 +1,120 @@
-import re
+import discord
+import sys
 
-from typing import Optional, List
-from utils.models import FilteredWord, ApprovedInvite
+from typing import Optional, List, Dict, FrozenSet, Iterable
+from utils import crud
+from utils.automaton import WordAutomaton
+from utils.models import db, Channel, FilteredWord, ApprovedInvite
+from utils.normalize import fold
+
+
+class VideoBlocklist:
+    """
+    Banned YouTube video ids.
+
+    The ids are kept lowercased in a frozenset that is replaced as a whole when the list changes,
+    so a scan always sees a complete list and each lookup is a single hash probe.
+    """
+    def __init__(self):
+        self.ids: FrozenSet[str] = frozenset()
+
+    def build(self, video_ids: Iterable[str]):
+        self.ids = frozenset(video_id.lower() for video_id in video_ids)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id.lower() in self.ids
+
+    def __len__(self):
+        return len(self.ids)
 
 
 class WordFilterManager:
+    # kind matched against the video ids of youtube links instead of the message text
+    video_kind = 'piracy video'
+
     def __init__(self):
         self.kinds = ('piracy tool', 'piracy video', 'piracy tool alert', 'drama', 'unbanning tool', 'piracy site', 'scamming site')
         self.filter = {}
-        self.word_exp = {}
+        self.word_kind = {}
+        # folded word -> words folding to it
+        self.folded_words: Dict[str, List[str]] = {}
+        self.automaton = WordAutomaton()
+        self.video_blocklist = VideoBlocklist()
+        # increased every time the search structures change
+        self.generation = 0
 
     async def load(self):
+        self.word_kind.clear()
+        self.folded_words.clear()
         for kind in self.kinds:
             self.filter[kind] = []
             for entry in await self.fetch_by_kind(kind=kind):
-                self.filter[kind].append(entry.word)
-                self.word_exp[entry.word] = re.compile(r"[ *_\-~]*".join(list(entry.word)))
+                self.index_word(entry.word, kind)
+        self.build()
         print("Loaded word filter")
 
+    def index_word(self, word: str, kind: str):
+        """Adds a word to the in-memory index. The search structures must be rebuilt afterwards."""
+        self.filter[kind].append(word)
+        self.word_kind[word] = kind
+        if kind == self.video_kind:
+            return
+        # words are matched against the folded text, so they are folded the same way
+        self.folded_words.setdefault(fold(word), []).append(word)
+
+    def unindex_word(self, word: str):
+        """Removes a word from the in-memory index. The search structures must be rebuilt afterwards."""
+        kind = self.word_kind.pop(word)
+        self.filter[kind].remove(word)
+        if kind == self.video_kind:
+            return
+        key = fold(word)
+        self.folded_words[key].remove(word)
+        if not self.folded_words[key]:
+            del self.folded_words[key]
+
+    def build(self, kind: str = None):
+        """Rebuilds the search structures affected by changes to words of kind, or all of them.
+
+        The automaton is rebuilt whole and swapped in, scans running in worker threads keep using the old one."""
+        if kind is None or kind == self.video_kind:
+            self.video_blocklist.build(self.filter[self.video_kind])
+        if kind != self.video_kind:
+            self.automaton = WordAutomaton({key: tuple((word, self.word_kind[word]) for word in words)
+                                            for key, words in self.folded_words.items()})
+        self.generation += 1
+
+    def search(self, text: str) -> Dict[str, List[str]]:
+        """Scans text once and returns the filtered words found in it grouped by kind.
+
+        Only reads the current automaton, so it can be run in a worker thread."""
+        automaton = self.automaton
+        hits = {kind: [] for kind in self.kinds}
+        for key in automaton.search(text):
+            for word, kind in automaton.words[key]:
+                hits[kind].append(word)
+        return hits
+
     async def add(self, word: str, kind: str) -> FilteredWord:
         entry = await FilteredWord.create(word=word, kind=kind)
-        await self.load()
+        self.index_word(entry.word, kind)
+        self.build(kind)
         return entry
 
+    async def add_many(self, words: List[str], kind: str) -> List[str]:
+        """Adds several words of the same kind in a single transaction.
+
+        Returns the words that were added, words already in the filter are skipped."""
+        words = [word for word in dict.fromkeys(words) if word not in self.word_kind]
+        if not words:
+            return []
+        async with db.transaction():
+            await db.status(FilteredWord.__table__.insert().values([{'word': word, 'kind': kind} for word in words]))
+        for word in words:
+            self.index_word(word, kind)
+        self.build(kind)
+        return words
+
     @staticmethod
     async def fetch_by_kind(kind: str) -> List[FilteredWord]:
         return await FilteredWord.query.where(FilteredWord.kind == kind).gino.all()
@@ -35,24 +127,95 @@ class WordFilterManager:
         entry = await self.fetch_word(word)
         if entry:
             await entry.delete()
-            self.filter[entry.kind].remove(entry.word)
-            del self.word_exp[entry.word]
+            self.unindex_word(entry.word)
+            self.build(entry.kind)
         return entry
 
+    async def delete_many(self, words: List[str]) -> List[str]:
+        """Deletes several words in a single statement and returns the ones that were in the filter."""
+        words = [word for word in dict.fromkeys(words) if word in self.word_kind]
+        if not words:
+            return []
+        await FilteredWord.delete.where(FilteredWord.word.in_(words)).gino.status()
+        for word in words:
+            self.unindex_word(word)
+        self.build()
+        return words
+
 
 class InviteFilterManager:
-    def __init__(self):
-        self.invites = []
+    """
+    Keeps the approved invites indexed by code, alias and guild id.
+
+    Uses of temporary invites are counted in memory and written to the database in batches
+    by a job running every `flush_interval` seconds, an invite is unapproved as soon as its last use is spent.
+    """
+    def __init__(self, flush_interval: float = 10.0):
+        self.flush_interval = flush_interval
+        self.invites: Dict[str, ApprovedInvite] = {}
+        self.aliases: Dict[str, str] = {}
+        # guild id -> codes of the approved invites to it, replaced as a whole so scan workers can read it
+        self.guilds: Dict[int, FrozenSet[str]] = {}
+        # code -> uses spent since the last flush
+        self.pending_uses: Dict[str, int] = {}
 
     async def load(self):
+        await self.flush()
         self.invites.clear()
-        self.invites = await self.fetch_all()
+        self.aliases.clear()
+        self.guilds.clear()
+        for invite in await self.fetch_all():
+            self.index(invite)
+        print("Loaded invite filter")
+
+    def index(self, invite: ApprovedInvite):
+        self.invites[invite.code] = invite
+        self.aliases[invite.alias] = invite.code
+        if invite.guild_id:
+            self.guilds[invite.guild_id] = self.guilds.get(invite.guild_id, frozenset()) | {invite.code}
+
+    def unindex(self, code: str) -> Optional[ApprovedInvite]:
+        invite = self.invites.pop(code, None)
+        if invite and self.aliases.get(invite.alias) == code:
+            del self.aliases[invite.alias]
+        if invite and code in (codes := self.guilds.get(invite.guild_id, frozenset())):
+            if codes := codes - {code}:
+                self.guilds[invite.guild_id] = codes
+            else:
+                del self.guilds[invite.guild_id]
+        return invite
+
+    def get(self, code: str) -> Optional[ApprovedInvite]:
+        return self.invites.get(code)
+
+    def get_by_alias(self, alias: str) -> Optional[ApprovedInvite]:
+        code = self.aliases.get(alias)
+        return self.invites.get(code) if code else None
 
-    async def add(self, code: str, alias: str, uses: int) -> ApprovedInvite:
-        entry = await ApprovedInvite.create(code=code, uses=uses, alias=alias)
-        self.invites.append(entry)
+    def get_by_guild(self, guild_id: int) -> Optional[ApprovedInvite]:
+        """Returns an approved invite to the guild, a permanent one if any so no temporary uses are spent."""
+        invites = [invite for code in self.guilds.get(guild_id, ()) if (invite := self.invites.get(code))]
+        permanent = [invite for invite in invites if not invite.is_temporary]
+        if permanent:
+            return permanent[0]
+        return max(invites, key=lambda invite: invite.uses, default=None)
+
+    async def add(self, code: str, alias: str, uses: int, guild_id: int = None) -> ApprovedInvite:
+        entry = await ApprovedInvite.create(code=code, uses=uses, alias=alias, guild_id=guild_id)
+        self.index(entry)
         return entry
 
+    async def backfill_guilds(self, resolver):
+        """Resolves and stores the guild of the invites approved before guild ids were recorded."""
+        for invite in [x for x in self.invites.values() if x.guild_id is None]:
+            try:
+                guild_id = await resolver.resolve(invite.code)
+            except discord.HTTPException:
+                continue
+            if guild_id and self.invites.get(invite.code) is invite:
+                await invite.update(guild_id=guild_id).apply()
+                self.guilds[guild_id] = self.guilds.get(guild_id, frozenset()) | {invite.code}
+
     @staticmethod
     async def fetch_all() -> List[ApprovedInvite]:
         return await ApprovedInvite.query.gino.all()
@@ -65,14 +228,96 @@ class InviteFilterManager:
     async def fetch_invite_by_code(code) -> Optional[ApprovedInvite]:
         return await ApprovedInvite.get(code)
 
-    async def set_uses(self, code: str, uses: int):
-        invite = await ApprovedInvite.get(code)
-        await invite.update(uses=uses).apply()
-        await self.load()
+    def use(self, code: str):
+        """Spends a use of a temporary invite, the database is updated by the next flush."""
+        invite = self.invites.get(code)
+        if invite is None or not invite.is_temporary:
+            return
+        invite.uses -= 1
+        if invite.uses <= 0:
+            self.unindex(code)
+        self.pending_uses[code] = self.pending_uses.get(code, 0) + 1
+
+    async def flush(self):
+        """Writes the pending uses in a single transaction, deleting the invites with no uses left."""
+        if not self.pending_uses:
+            return
+        pending, self.pending_uses = self.pending_uses, {}
+        try:
+            async with db.transaction():
+                for code, spent in pending.items():
+                    await ApprovedInvite.update.values(uses=ApprovedInvite.uses - spent).where(
+                        ApprovedInvite.code == code).gino.status()
+                await ApprovedInvite.delete.where(
+                    ApprovedInvite.code.in_(list(pending)) & (ApprovedInvite.uses <= 0)).gino.status()
+        except Exception as e:
+            # keep the uses for the next flush
+            for code, spent in pending.items():
+                self.pending_uses[code] = self.pending_uses.get(code, 0) + spent
+            print(f'Failed to flush invite uses: {e.__class__.__name__}: {e}', file=sys.stderr)
 
     async def delete(self, code: str):
         entry = await self.fetch_invite_by_code(code)
         if entry:
             await entry.delete()
-            await self.load()
+        self.pending_uses.pop(code, None)
+        self.unindex(code)
         return entry
+
+
+class WatchManager:
+    """Keeps the ids of the watched users in memory, writes go through to the database."""
+    def __init__(self):
+        self.watched = set()
+
+    async def load(self):
+        self.watched = {member.id for member in await crud.get_watched()}
+        print("Loaded watch list")
+
+    def is_watched(self, user_id: int) -> bool:
+        return user_id in self.watched
+
+    @property
+    def count(self) -> int:
+        return len(self.watched)
+
+    async def add(self, user_id: int):
+        await crud.add_watch(user_id)
+        self.watched.add(user_id)
+
+    async def remove(self, user_id: int):
+        await crud.remove_watch(user_id)
+        self.watched.discard(user_id)
+
+
+class ChannelStateManager:
+    """Keeps the rows of the channels table in memory so the message filter doesn't need to query them.
+
+    The cached rows are the same objects the commands update, so changes applied to them are seen immediately."""
+    def __init__(self):
+        self.channels: Dict[int, Channel] = {}
+
+    async def load(self):
+        self.channels = {db_channel.id: db_channel for db_channel in await crud.get_dbchannels()}
+        print("Loaded channel states")
+
+    def get(self, channel_id: int) -> Optional[Channel]:
+        return self.channels.get(channel_id)
+
+    def is_nofilter(self, channel) -> bool:
+        db_channel = self.channels.get(channel.id)
+        return db_channel.nofilter if db_channel else False
+
+    async def get_or_create(self, channel) -> Channel:
+        if not (db_channel := self.channels.get(channel.id)):
+            db_channel = await crud.add_dbchannel(channel.id, channel.name)
+            self.channels[db_channel.id] = db_channel
+        return db_channel
+
+    async def add_nofilter(self, channel):
+        db_channel = await crud.add_nofilter(channel)
+        self.channels[db_channel.id] = db_channel
+
+    async def remove_nofilter(self, channel):
+        if db_channel := await crud.remove_nofilter(channel):
+            self.channels[db_channel.id] = db_channel
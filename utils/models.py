@@ -100,6 +100,7 @@ class ApprovedInvite(db.Model):
     code = db.Column(db.String(), primary_key=True)
     uses = db.Column(db.Integer(), default=-1)
     alias = db.Column(db.String())
+    guild_id = db.Column(db.BigInteger())
 
     @property
     def is_temporary(self):
@@ -0,0 +1,113 @@
+import re
+import unicodedata
+
+from functools import cached_property
+from string import printable
+from typing import List, Optional, Tuple
+
+# modified regular expresion made by deme72
+video_id_re = re.compile(r'(?:(?:https?://)?(?:www.)?)(?:(?:youtube\.com/watch\?v=)|(?:youtu\.be/))([aA-zZ_\-\d]{11})')
+invite_re = re.compile(r'(?:discordapp\.com/invite|discord\.gg)/([\w]+)')
+url_re = re.compile(r'(https?://\S+)')
+non_printable_re = re.compile(f'[^{re.escape(printable)}]')
+
+separators = ' *_-~'
+separators_table = str.maketrans('', '', separators)
+
+# characters commonly used in place of a letter to evade the word filter
+confusables = {
+    # leetspeak
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's',
+    # cyrillic
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o', 'р': 'p', 'с': 'c', 'т': 't',
+    'у': 'y', 'х': 'x', 'ѕ': 's', 'і': 'i', 'ї': 'i', 'ј': 'j', 'ԁ': 'd', 'ӏ': 'l', 'ԛ': 'q', 'ԝ': 'w',
+    # greek
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u',
+    'χ': 'x', 'ω': 'w',
+}
+
+
+def fold_char(char: str) -> Optional[str]:
+    """Returns the lowercase printable ascii character char looks like, None if there is none."""
+    lowered = char.lower()
+    if len(lowered) == 1:
+        if lowered in confusables:
+            return confusables[lowered]
+        if lowered in printable:
+            return lowered
+    # fullwidth forms, accented letters and the like decompose to an ascii character
+    decomposed = unicodedata.normalize('NFKD', char)[:1].lower()
+    if decomposed and decomposed in printable:
+        return confusables.get(decomposed, decomposed)
+    return None
+
+
+class FoldTable(dict):
+    """
+    Translate table mapping every character to at most one character, so the offsets of
+    the folded text can be mapped back to the original text.
+
+    Printable ascii characters are precomputed, any other character is folded the first time
+    it's seen and then cached.
+    """
+    def __init__(self):
+        super().__init__((ord(char), fold_char(char)) for char in map(chr, range(128)))
+        self.update((ord(char), value) for char, value in confusables.items())
+
+    def __missing__(self, codepoint: int) -> Optional[str]:
+        self[codepoint] = folded = fold_char(chr(codepoint))
+        return folded
+
+
+fold_table = FoldTable()
+
+
+def fold(text: str) -> str:
+    return text.translate(fold_table)
+
+
+class NormalizedMessage:
+    """
+    Holds the views of a message's content used by the filters, so each one is only computed once per scan.
+    """
+    def __init__(self, content: str):
+        self.content = content
+        # lowered content with every character not in string.printable dropped
+        self.text = non_printable_re.sub('', content.lower())
+        # text with look-alike characters folded, used by the word filter
+        self.folded = fold(content)
+        self.no_separators = self.folded.translate(separators_table)
+
+    @cached_property
+    def text_no_separators(self) -> str:
+        """text without separators, for the checks that match the message as typed."""
+        return self.text.translate(separators_table)
+
+    @cached_property
+    def offsets(self) -> List[int]:
+        """Offset in content of every character of folded."""
+        return [i for i, char in enumerate(self.content) if fold_table[ord(char)] is not None]
+
+    @cached_property
+    def kept_offsets(self) -> List[int]:
+        """Offset in content of every character of no_separators."""
+        return [offset for offset, char in zip(self.offsets, self.folded) if char not in separators]
+
+    def find(self, word: str) -> Optional[Tuple[int, int]]:
+        """Finds a folded word in no_separators and returns the span of content it was folded from."""
+        start = self.no_separators.find(word)
+        if start == -1 or not word:
+            return None
+        return self.kept_offsets[start], self.kept_offsets[start + len(word) - 1] + 1
+
+    @cached_property
+    def video_ids(self) -> List[str]:
+        return video_id_re.findall(self.content)
+
+    @cached_property
+    def invite_codes(self) -> List[str]:
+        return invite_re.findall(self.content)
+
+    @cached_property
+    def urls(self) -> List[str]:
+        return url_re.findall(self.text)
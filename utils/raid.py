@@ -0,0 +1,104 @@
+import asyncio
+import discord
+import sys
+import traceback
+
+from collections import deque
+from time import monotonic
+from typing import Deque, List, Optional, Set, Tuple
+from utils.ratelimit import MessageRecord, SlidingWindow
+
+
+class RaidMonitor:
+    """
+    Watches the join rate and switches to raid mode when `threshold` members join within `window` seconds.
+
+    While in raid mode the roles of new members are applied by a single worker that edits one member every
+    `probation_interval` seconds, and join logs are collected into a digest posted every `digest_interval`
+    seconds by a periodic job. Raid mode ends by itself once no burst has been seen for `cooldown` seconds.
+    """
+    def __init__(self, bot, window: float = 10.0, threshold: int = 10, cooldown: float = 120.0,
+                 digest_interval: float = 30.0, probation_interval: float = 1.0):
+        self.bot = bot
+        self.joins = SlidingWindow(window=window, max_records=threshold)
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.digest_interval = digest_interval
+        self.probation_interval = probation_interval
+        self.active = False
+        self.last_burst = 0.0
+        self.probation_queue: Deque[Tuple[discord.Member, Set[discord.Role]]] = deque()
+        self.digest: List[str] = []
+        self.probation_task: Optional[asyncio.Task] = None
+        bot.jobs.every('raid-digest', digest_interval, self.tick)
+
+    def record_join(self, member: discord.Member) -> bool:
+        """Records a join and returns if the server is in raid mode."""
+        now = monotonic()
+        if len(self.joins.add('joins', MessageRecord(member.id, 0, now))) >= self.threshold:
+            self.last_burst = now
+            if not self.active:
+                self.start_raid()
+        return self.active
+
+    def start_raid(self):
+        self.active = True
+        self.bot.logdispatcher.send(self.bot.channels['mods'],
+            f"🚨 **Raid mode enabled**: {self.threshold} or more members joined in {self.joins.window:g} seconds. "
+            f"New members are being probated and join logs will be posted as digests. @here",
+            allowed_mentions=discord.AllowedMentions(everyone=True), urgent=True)
+
+    async def tick(self):
+        """Posts the join digest while in raid mode and ends raid mode once the cooldown is over."""
+        if not self.active:
+            return
+        self.flush_digest()
+        if monotonic() - self.last_burst >= self.cooldown:
+            self.end_raid()
+
+    def end_raid(self):
+        self.active = False
+        self.bot.logdispatcher.send(self.bot.channels['mods'],
+            f"✅ **Raid mode disabled**: no join burst in the last {self.cooldown:g} seconds. "
+            f"{len(self.probation_queue)} members are still waiting to be probated.")
+
+    def queue_roles(self, member: discord.Member, roles: Set[discord.Role]):
+        """Queues the join roles of a member to be applied by the worker."""
+        self.probation_queue.append((member, roles))
+        if self.probation_task is None or self.probation_task.done():
+            self.probation_task = asyncio.create_task(self.probation_worker())
+
+    async def probation_worker(self):
+        while self.probation_queue:
+            member, roles = self.probation_queue.popleft()
+            try:
+                await member.add_roles(*roles, reason="Raid mode auto-probation", atomic=False)
+            except discord.NotFound:
+                pass  # the member already left
+            except Exception as e:
+                print(f'Ignoring exception while probating {member}', file=sys.stderr)
+                traceback.print_tb(e.__traceback__)
+                print(f'{e.__class__.__name__}: {e}', file=sys.stderr)
+            await asyncio.sleep(self.probation_interval)
+
+    def log_join(self, line: str):
+        self.digest.append(line)
+
+    def flush_digest(self):
+        if not self.digest:
+            return
+        lines, self.digest = self.digest, []
+        header = f"✅ **Join digest**: {len(lines)} members joined during raid mode"
+        chunk = header
+        for line in lines:
+            if len(chunk) + len(line) + 1 > self.bot.logdispatcher.max_content:
+                self.bot.logdispatcher.send(self.bot.channels['server-logs'], chunk)
+                chunk = line
+            else:
+                chunk = f"{chunk}\n{line}"
+        self.bot.logdispatcher.send(self.bot.channels['server-logs'], chunk)
+
+    def close(self):
+        if self.probation_task:
+            self.probation_task.cancel()
+        self.flush_digest()
@@ -0,0 +1,69 @@
+from collections import deque
+from time import monotonic
+from typing import Deque, Dict, Hashable, List, Optional
+
+
+class MessageRecord:
+    """Compact record of a message kept by the sliding windows instead of the message itself."""
+    __slots__ = ('message_id', 'channel_id', 'timestamp', 'mentions')
+
+    def __init__(self, message_id: int, channel_id: int, timestamp: float, mentions: int = 0):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.timestamp = timestamp
+        self.mentions = mentions
+
+
+class SlidingWindow:
+    """
+    Per-key ring buffers of the message records seen in the last `window` seconds.
+
+    Old records are dropped when a key is updated and by the periodic sweep, so each message costs
+    amortized O(1) and a key never holds more than `max_records` records.
+    """
+    def __init__(self, window: float, max_records: int):
+        self.window = window
+        self.max_records = max_records
+        self.records: Dict[Hashable, Deque[MessageRecord]] = {}
+
+    def expire(self, key: Hashable, now: float) -> Optional[Deque[MessageRecord]]:
+        bucket = self.records.get(key)
+        if bucket is None:
+            return None
+        limit = now - self.window
+        while bucket and bucket[0].timestamp <= limit:
+            bucket.popleft()
+        if not bucket:
+            del self.records[key]
+            return None
+        return bucket
+
+    def add(self, key: Hashable, record: MessageRecord) -> Deque[MessageRecord]:
+        """Adds a record and returns the records for the key that are still in the window."""
+        if (bucket := self.expire(key, record.timestamp)) is None:
+            bucket = self.records[key] = deque(maxlen=self.max_records)
+        bucket.append(record)
+        return bucket
+
+    def pop(self, key: Hashable) -> List[MessageRecord]:
+        """Removes and returns every record for the key."""
+        return list(self.records.pop(key, ()))
+
+    def sweep(self, now: float = None):
+        now = monotonic() if now is None else now
+        for key in list(self.records):
+            self.expire(key, now)
+
+    def __len__(self):
+        return len(self.records)
+
+
+class WindowSweeper:
+    """Expires the records of several sliding windows, registered as a periodic job."""
+    def __init__(self, *windows: SlidingWindow):
+        self.windows = windows
+
+    async def sweep(self):
+        now = monotonic()
+        for window in self.windows:
+            window.sweep(now)
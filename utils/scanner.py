@@ -0,0 +1,213 @@
+import asyncio
+import discord
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+from typing import OrderedDict as OrderedDictType
+from utils.normalize import NormalizedMessage
+
+# order in which rules of the same terminality are run, harsher actions go first
+actions = ('probate', 'delete', 'log')
+
+
+class ScanContext:
+    """
+    State shared by the rules while scanning a single message.
+    """
+    def __init__(self, message: discord.Message, normalized: NormalizedMessage, embed: discord.Embed, is_edit: bool = False):
+        self.message = message
+        self.normalized = normalized
+        self.embed = embed
+        self.is_edit = is_edit
+        self.filter_hits = {}
+        # results of the cacheable rules, shared by every message with the same content
+        self.results = {}
+        # approved invites, non-approved codes and codes pending resolution
+        self.invites = None
+        self.fired = []
+        # (rule, check time or None for a cached result, fired) of every evaluated rule
+        self.stats: List[Tuple['ScanRule', Optional[float], bool]] = []
+
+
+class ScanRule:
+    """
+    A check run against scanned messages.
+
+    The check receives the ScanContext and returns a falsy value if the rule doesn't apply, anything else
+    is passed to the handler coroutine which takes the enforcement action.
+    A terminal rule deletes the message, so no other rule is run after it fires.
+    The result of a cacheable rule only depends on the message content and the word filter, so it's
+    reused for messages with the same content.
+    """
+    def __init__(self, name: str, check: Callable[[ScanContext], Any], handler: Callable[[ScanContext, Any], Coroutine],
+                 *, action: str, cost: int = 1, terminal: bool = False, cacheable: bool = False):
+        if action not in actions:
+            raise ValueError(f"Unknown rule action {action}")
+        self.name = name
+        self.check = check
+        self.handler = handler
+        self.action = action
+        self.cost = cost
+        self.terminal = terminal
+        self.cacheable = cacheable
+        # checks actually run, and results reused from the verdict cache
+        self.runs = 0
+        self.cached = 0
+        self.hits = 0
+        self.time = 0.0
+
+    @property
+    def sort_key(self):
+        return not self.terminal, actions.index(self.action), self.cost
+
+    @property
+    def average_time(self) -> float:
+        """Average time spent in the check in microseconds."""
+        return self.time / self.runs * 1e6 if self.runs else 0.0
+
+
+class ScanEngine:
+    """
+    Runs the registered rules against a message, terminal rules first and cheapest first,
+    stopping as soon as a terminal rule fires.
+    """
+    def __init__(self):
+        self.rules: List[ScanRule] = []
+
+    def register(self, rule: ScanRule):
+        """Adds a rule, replacing any rule with the same name."""
+        self.unregister(rule.name)
+        self.rules.append(rule)
+        self.rules.sort(key=lambda r: r.sort_key)
+
+    def unregister(self, name: str) -> Optional[ScanRule]:
+        for rule in self.rules:
+            if rule.name == name:
+                self.rules.remove(rule)
+                return rule
+        return None
+
+    def evaluate(self, ctx: ScanContext) -> List[Tuple[ScanRule, Any]]:
+        """Runs the checks and returns the rules that fired with their results, doesn't take any action.
+
+        Doesn't touch the event loop or the rules, so it can be run in a worker thread.
+        The stats are kept in the context until `record` is called from the event loop."""
+        fired = []
+        for rule in self.rules:
+            if rule.cacheable and rule.name in ctx.results:
+                result = ctx.results[rule.name]
+                elapsed = None
+            else:
+                start = perf_counter()
+                result = rule.check(ctx)
+                elapsed = perf_counter() - start
+                if rule.cacheable:
+                    ctx.results[rule.name] = result
+            ctx.stats.append((rule, elapsed, bool(result)))
+            if not result:
+                continue
+            ctx.fired.append(rule.name)
+            fired.append((rule, result))
+            if rule.terminal:
+                break
+        return fired
+
+    @staticmethod
+    def record(ctx: ScanContext):
+        """Adds the stats of an evaluation to the rules."""
+        for rule, elapsed, hit in ctx.stats:
+            if elapsed is None:
+                rule.cached += 1
+            else:
+                rule.runs += 1
+                rule.time += elapsed
+            rule.hits += hit
+        ctx.stats.clear()
+
+    @staticmethod
+    async def handle(ctx: ScanContext, fired: List[Tuple[ScanRule, Any]]):
+        for rule, result in fired:
+            await rule.handler(ctx, result)
+
+
+class ScanVerdicts:
+    """Normalized content, word filter hits and cacheable rule results of a message content."""
+    __slots__ = ('normalized', 'filter_hits', 'results', 'generation')
+
+    def __init__(self, normalized: NormalizedMessage, filter_hits: Dict[str, List[str]], generation: int):
+        self.normalized = normalized
+        self.filter_hits = filter_hits
+        self.results = {}
+        self.generation = generation
+
+
+class ScanCache:
+    """
+    LRU of the verdicts of recently scanned contents, so edits that keep the content and
+    repeated messages skip the normalization and the cacheable rules.
+
+    Verdicts computed with an older word filter generation are discarded.
+    """
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self.verdicts: OrderedDictType[str, ScanVerdicts] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, content: str, generation: int) -> Optional[ScanVerdicts]:
+        verdicts = self.verdicts.get(content)
+        if verdicts is None or verdicts.generation != generation:
+            self.misses += 1
+            return None
+        self.verdicts.move_to_end(content)
+        self.hits += 1
+        return verdicts
+
+    def put(self, content: str, verdicts: ScanVerdicts):
+        self.verdicts[content] = verdicts
+        self.verdicts.move_to_end(content)
+        while len(self.verdicts) > self.max_size:
+            self.verdicts.popitem(last=False)
+
+    def clear(self):
+        self.verdicts.clear()
+
+
+class ScanOverflow(Exception):
+    """Raised when too many scans are already waiting for a worker."""
+
+
+class ScanOffloader:
+    """
+    Runs the evaluation of expensive messages in worker threads so they don't stall the event loop.
+
+    At most `max_pending` scans can be running or queued, more raise ScanOverflow, and a scan that takes
+    longer than `timeout` seconds raises asyncio.TimeoutError. A timed out scan keeps its slot until
+    the worker actually finishes, so stuck workers also apply backpressure.
+    """
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, timeout: float = 2.0, inline_limit: int = 1000):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scan')
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.inline_limit = inline_limit
+        self.pending = 0
+
+    def is_expensive(self, content: str) -> bool:
+        # runs of separators are what makes the word filter work harder, so they weigh more
+        return len(content) + sum(map(content.count, '*_-~')) > self.inline_limit
+
+    def done(self, _):
+        self.pending -= 1
+
+    async def run(self, func: Callable, *args):
+        if self.pending >= self.max_pending:
+            raise ScanOverflow
+        self.pending += 1
+        future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        future.add_done_callback(self.done)
+        return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
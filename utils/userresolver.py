@@ -0,0 +1,76 @@
+import asyncio
+import discord
+
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict, Iterable, Tuple
+from typing import OrderedDict as OrderedDictType
+
+
+class UserResolver:
+    """
+    LRU cache with expiry of the users fetched from the API.
+
+    Users are looked up in the gateway cache first, then in the LRU, and only then fetched, sharing
+    a single request between every caller waiting on the same user.
+    """
+    def __init__(self, bot: discord.Client, ttl: float = 3600.0, max_size: int = 1024):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_size = max_size
+        # user id -> (user, expiry)
+        self.cache: OrderedDictType[int, Tuple[discord.User, float]] = OrderedDict()
+        self.inflight: Dict[int, asyncio.Task] = {}
+
+    def lookup(self, user_id: int):
+        """Returns the user if it is in the gateway cache or the LRU, without touching the API."""
+        if user := self.bot.get_user(user_id):
+            return user
+        entry = self.cache.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] <= monotonic():
+            del self.cache[user_id]
+            return None
+        self.cache.move_to_end(user_id)
+        return entry[0]
+
+    def put(self, user: discord.User):
+        self.cache[user.id] = (user, monotonic() + self.ttl)
+        self.cache.move_to_end(user.id)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+    async def resolve(self, user_id: int) -> discord.User:
+        """Returns the user, raises discord.NotFound if it doesn't exist."""
+        if user := self.lookup(user_id):
+            return user
+        if (task := self.inflight.get(user_id)) is None:
+            task = self.inflight[user_id] = asyncio.create_task(self.fetch(user_id))
+            task.add_done_callback(lambda _: self.inflight.pop(user_id, None))
+        return await asyncio.shield(task)
+
+    async def resolve_many(self, user_ids: Iterable[int]) -> Dict[int, discord.User]:
+        """Resolves several users, fetching every unknown one concurrently and each only once.
+
+        Users that don't exist are left out."""
+        found = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            if user := self.lookup(user_id):
+                found[user_id] = user
+            else:
+                missing.append(user_id)
+        users = await asyncio.gather(*(self.resolve(user_id) for user_id in missing), return_exceptions=True)
+        for user_id, user in zip(missing, users):
+            if isinstance(user, discord.NotFound):
+                continue
+            if isinstance(user, Exception):
+                raise user
+            found[user_id] = user
+        return found
+
+    async def fetch(self, user_id: int) -> discord.User:
+        user = await self.bot.fetch_user(user_id)
+        self.put(user)
+        return user
@@ -1,6 +1,9 @@
+import asyncio
 import discord
 import random
 import re
+import sys
+import traceback
 
 from discord.ext import commands
 
@@ -42,6 +45,29 @@ async def send_dm_message(member: discord.Member, message: str, ctx: commands.Co
         return False
 
 
+async def delete_message(message: discord.Message) -> bool:
+    """Deletes a message, ignoring it if it was already deleted.
+
+    Returns a boolean indicating if the message was deleted."""
+    try:
+        await message.delete()
+        return True
+    except discord.NotFound:
+        return False
+
+
+async def gather_actions(*actions):
+    """Runs independent actions concurrently, a failing action doesn't stop the others.
+
+    Returns the results in order, exceptions are printed and returned in place of the result."""
+    results = await asyncio.gather(*actions, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            print('Ignoring exception in concurrent action', file=sys.stderr)
+            traceback.print_exception(type(result), result, result.__traceback__)
+    return results
+
+
 def command_signature(command, *, prefix=".") -> str:
     """Helper method for a command signature
 
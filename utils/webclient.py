@@ -0,0 +1,115 @@
+import aiohttp
+import asyncio
+import json
+import random
+
+from collections import OrderedDict
+from typing import Dict, Mapping, Optional, Tuple
+from typing import OrderedDict as OrderedDictType
+
+
+class WebResponse:
+    """A fully read response. `modified` is False when the server answered 304 and the cached body was reused."""
+    __slots__ = ('url', 'status', 'headers', 'body', 'modified')
+
+    def __init__(self, url: str, status: int, headers: Mapping[str, str], body: bytes, modified: bool = True):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.modified = modified
+
+    def text(self, encoding: str = 'utf-8') -> str:
+        return self.body.decode(encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class WebClient:
+    """
+    HTTP client shared by the whole bot, keeping connections alive between requests.
+
+    Identical GET requests made at the same time share a single request. Requests made with `cache=True` remember
+    the ETag and Last-Modified of the response and send them back, so unchanged resources are answered with a 304
+    and the cached body. Connection errors, timeouts, 429 and 5xx responses are retried with jittered
+    exponential backoff.
+    """
+    retry_statuses = {429, 500, 502, 503, 504}
+
+    def __init__(self, timeout: float = 10.0, retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 cache_size: int = 64):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache_size = cache_size
+        # url -> last 200 response with validators
+        self.cache: OrderedDictType[str, WebResponse] = OrderedDict()
+        self.inflight: Dict[Tuple, asyncio.Task] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The pooled session, for callers that need to stream a response."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60),
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def get(self, url: str, *, headers: Dict[str, str] = None, cache: bool = False,
+                  timeout: float = None, retries: int = None) -> WebResponse:
+        """GETs url, sharing the request with any identical one in flight.
+
+        Errors are raised once every retry failed, a 429 or 5xx status is returned after the last retry."""
+        retries = self.retries if retries is None else retries
+        key = (url, tuple(sorted(headers.items())) if headers else (), cache, timeout, retries)
+        if (task := self.inflight.get(key)) is None:
+            task = self.inflight[key] = asyncio.create_task(self.fetch(url, headers or {}, cache, timeout, retries))
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def fetch(self, url: str, headers: Dict[str, str], cache: bool, timeout: Optional[float],
+                    retries: int) -> WebResponse:
+        cached = self.cache.get(url) if cache else None
+        if cached:
+            headers = dict(headers)
+            if etag := cached.headers.get('ETag'):
+                headers['If-None-Match'] = etag
+            if last_modified := cached.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = last_modified
+        options = {'timeout': aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        attempt = 0
+        while True:
+            try:
+                async with self.session.get(url, headers=headers, **options) as r:
+                    if r.status in self.retry_statuses and attempt < retries:
+                        retry_after = r.headers.get('Retry-After', '')
+                        delay = float(retry_after) if retry_after.isdigit() else self.backoff(attempt)
+                    else:
+                        if r.status == 304 and cached:
+                            self.cache.move_to_end(url)
+                            return WebResponse(url, cached.status, cached.headers, cached.body, modified=False)
+                        response = WebResponse(url, r.status, r.headers.copy(), await r.read())
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= retries:
+                    raise
+                delay = self.backoff(attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+        if cache and response.status == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+            self.cache[url] = response
+            self.cache.move_to_end(url)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return response
+
+    async def close(self):
+        for task in list(self.inflight.values()):
+            task.cancel()
+        if self._session:
+            await self._session.close()